@@ -1,8 +1,50 @@
+import json
+
+from tracing import NullTracer
+
+
+def estimate_tokens(messages):
+  """Rough prompt size: ~4 characters per token plus a few tokens of framing per message."""
+  return sum(len(message["content"] or "") // 4 + 4 for message in messages)
+
+
+def tool_reply(message):
+  """The API's assistant message as a plain dict that can go back in `messages` (and in a recording)."""
+  reply = {"role": "assistant", "content": message.content or ""}
+  if message.tool_calls:
+    reply["tool_calls"] = [{
+      "id": call.id,
+      "type": "function",
+      "function": {"name": call.function.name, "arguments": call.function.arguments},
+    } for call in message.tool_calls]
+  return reply
+
 
 class Agent:
-  def __init__(self, client, system):
+  def __init__(self, client, system, model="llama3-70b-8192", stop="PAUSE",
+               token_budget=None, keep_recent=4, observation_chars=300, recorder=None, tracer=None,
+               small_model=None, accept=None, tools=None, scheduler=None, completion_reserve=256):
     self.client = client
     self.system = system
+    self.model = model
+    self.stop = stop
+    # compaction: keep the prompt under token_budget, the last keep_recent messages are never touched
+    self.token_budget = token_budget
+    self.keep_recent = keep_recent
+    self.observation_chars = observation_chars
+    self.usage = []  # prompt/completion tokens of every turn
+    self.recorder = recorder  # see recorder.py, records or replays the completions
+    self.tracer = tracer or NullTracer()  # see tracing.py, every model call is an "llm" span
+    # cascade: each turn goes to small_model first and is escalated to `model` only when
+    # accept(reply, messages) rejects the small model's reply
+    self.small_model = small_model
+    self.accept = accept
+    self.escalations = 0
+    # native function calling: JSON-schema tool definitions offered to the model by `step`
+    self.tools = tools
+    # see scheduler.py, model calls wait for a "groq" slot sized by the prompt plus completion_reserve tokens
+    self.scheduler = scheduler
+    self.completion_reserve = completion_reserve
     self.messages = []
     if self.system:
       self.messages.append({"role": "system", "content": self.system})
@@ -15,8 +57,237 @@ class Agent:
     return result
 
   def execute(self):
-    chat_completion = self.client.chat.completions.create(
+    self.compact()
+    if not self.small_model:
+      return self.call(self.model)
+    result = self.call(self.small_model)
+    if not self.accept or self.accept(result, self.messages):
+      return result
+    self.escalations += 1
+    return self.call(self.model)
+
+  def call(self, model):
+    with self.tracer.span("llm", model=model, messages=len(self.messages)) as span:
+      result = self.complete(model)
+      span.update(self.usage[-1], output_bytes=len(result))
+    return result
+
+  def complete(self, model):
+    recorded = self.replay(model)
+    if recorded is not None:
+      return recorded
+    chat_completion = self.scheduled(lambda: self.client.chat.completions.create(
+      messages=self.messages,
+      model=model
+    ))
+    self.record_usage(chat_completion.usage)
+    return self.record(chat_completion.choices[0].message.content, model)
+
+  def scheduled(self, create):
+    """Run a model call through the scheduler when there is one. Conversations further along go
+    first, so the queries already in flight finish before new ones take the quota."""
+    if not self.scheduler:
+      return create()
+    tokens = estimate_tokens(self.messages) + self.completion_reserve
+    result = self.scheduler.run("groq", create, tokens, priority=-len(self.messages), retries=3)
+    usage = getattr(result, "usage", None)
+    self.scheduler.settle("groq", tokens, usage.total_tokens if usage else None)
+    return result
+
+  def replay(self, model=None):
+    """The recorded completion for the current history, if there is a recorder that has it."""
+    if not self.recorder:
+      return None
+    recorded = self.recorder.lookup(model or self.model, self.messages)
+    if recorded is not None:
+      self.record_usage()
+    return recorded
+
+  def record(self, result, model=None):
+    if self.recorder:
+      self.recorder.save(model or self.model, self.messages, result)
+    return result
+
+  def compact(self):
+    """Shrink the history until it fits in `token_budget`.
+
+    The system prompt, the question and the most recent messages are kept as they are. Older
+    observations are truncated first, then the oldest turns are dropped if it's still too big.
+    """
+    if not self.token_budget or estimate_tokens(self.messages) <= self.token_budget:
+      return
+    head = 2 if self.system else 1
+    split = len(self.messages) - self.keep_recent
+    # tool results have to stay next to the reply that called them
+    while head < split < len(self.messages) and self.messages[split]["role"] == "tool":
+      split -= 1
+    if split <= head:
+      return
+    recent = self.messages[split:]
+    older = self.messages[head:split]
+    for message in older:
+      content = message["content"]
+      observation = message["role"] == "tool" or message["role"] == "user" and content.startswith("Observation:")
+      if observation and len(content) > self.observation_chars:
+        message["content"] = content[:self.observation_chars] + " ..."
+    # drop whole turns (a reply and its observations) so the roles keep alternating
+    while older and estimate_tokens(self.messages[:head] + older + recent) > self.token_budget:
+      del older[0]
+      while older and older[0]["role"] != "assistant":
+        del older[0]
+    self.messages[head:] = older + recent
+
+  def step(self, message=""):
+    """Native function calling: one turn with `tools` offered to the model.
+
+    Returns the assistant message as a dict, with its `tool_calls` (there can be several) when
+    the model wants to use tools, and keeps it in the history. The results go back with
+    `add_tool_results` before the next step. Native turns don't go through the cascade.
+    """
+    if message:
+      self.messages.append({"role": "user", "content": message})
+    self.compact()
+    with self.tracer.span("llm", model=self.model, messages=len(self.messages), native=True) as span:
+      recorded = self.replay()
+      if recorded is not None:
+        reply = json.loads(recorded)
+      else:
+        chat_completion = self.scheduled(lambda: self.client.chat.completions.create(**self.tool_request()))
+        self.record_usage(chat_completion.usage)
+        reply = tool_reply(chat_completion.choices[0].message)
+        self.record(json.dumps(reply))
+      span.update(self.usage[-1], tool_calls=len(reply.get("tool_calls", [])))
+    self.messages.append(reply)
+    return reply
+
+  def tool_request(self):
+    return {"messages": self.messages, "model": self.model, "tools": self.tools, "tool_choice": "auto"}
+
+  def add_tool_results(self, results):
+    """`results` are (tool_call_id, content) pairs, one for every call of the last step."""
+    for tool_call_id, content in results:
+      self.messages.append({"role": "tool", "tool_call_id": tool_call_id, "content": str(content)})
+
+  def record_usage(self, usage=None):
+    """Keep the prompt size of the turn, as reported by the API when available, otherwise estimated."""
+    self.usage.append({
+      "estimated_prompt_tokens": estimate_tokens(self.messages),
+      "prompt_tokens": usage.prompt_tokens if usage else None,
+      "completion_tokens": usage.completion_tokens if usage else None,
+    })
+
+  def stream(self, message=""):
+    """Yield the reply line by line as the tokens arrive, generation stops at the `stop` word.
+
+    Closing the generator early (e.g. right after an Action line) cancels the rest of
+    the completion, and only the lines consumed so far are kept in the history.
+    Streamed lines can't be taken back, so streaming always uses `model` and skips the cascade.
+    """
+    if message:
+      self.messages.append({"role": "user", "content": message})
+    self.compact()
+    with self.tracer.span("llm", model=self.model, messages=len(self.messages), stream=True) as span:
+      yield from self.complete_stream(span)
+
+  def complete_stream(self, span):
+    recorded = self.replay()
+    if recorded is not None:
+      span.update(self.usage[-1], output_bytes=len(recorded))
+      lines = []
+      try:
+        for line in recorded.split("\n"):
+          lines.append(line)
+          yield line
+      finally:
+        # what was consumed, as the live branch keeps it, so the history matches the recording
+        self.messages.append({"role": "assistant", "content": "\n".join(lines)})
+      return
+    self.record_usage()
+    span.update(self.usage[-1])
+    chunks = self.scheduled(lambda: self.client.chat.completions.create(
       messages=self.messages,
-      model="llama3-70b-8192"
-    )
-    return chat_completion.choices[0].message.content
+      model=self.model,
+      stop=self.stop,
+      stream=True
+    ))
+    lines = []
+    pending = ""
+    try:
+      for chunk in chunks:
+        pending += chunk.choices[0].delta.content or ""
+        *complete, pending = pending.split("\n")
+        for line in complete:
+          lines.append(line)
+          yield line
+      if pending:
+        lines.append(pending)
+        yield pending
+    finally:
+      chunks.close()
+      result = self.record("\n".join(lines))
+      span["output_bytes"] = len(result)
+      self.messages.append({"role": "assistant", "content": result})
+
+
+class AsyncAgent(Agent):
+  """Same conversation handling as `Agent`, but awaits an async client (e.g. `groq.AsyncGroq`)."""
+
+  async def __call__(self, message=""):
+    if message:
+      self.messages.append({"role": "user", "content": message})
+    result = await self.execute()
+    self.messages.append({"role": "assistant", "content": result})
+    return result
+
+  async def execute(self):
+    self.compact()
+    if not self.small_model:
+      return await self.call(self.model)
+    result = await self.call(self.small_model)
+    if not self.accept or self.accept(result, self.messages):
+      return result
+    self.escalations += 1
+    return await self.call(self.model)
+
+  async def call(self, model):
+    with self.tracer.span("llm", model=model, messages=len(self.messages)) as span:
+      result = await self.complete(model)
+      span.update(self.usage[-1], output_bytes=len(result))
+    return result
+
+  async def complete(self, model):
+    recorded = self.replay(model)
+    if recorded is not None:
+      return recorded
+    chat_completion = await self.ascheduled(lambda: self.client.chat.completions.create(
+      messages=self.messages,
+      model=model
+    ))
+    self.record_usage(chat_completion.usage)
+    return self.record(chat_completion.choices[0].message.content, model)
+
+  async def ascheduled(self, create):
+    if not self.scheduler:
+      return await create()
+    tokens = estimate_tokens(self.messages) + self.completion_reserve
+    result = await self.scheduler.arun("groq", create, tokens, priority=-len(self.messages), retries=3)
+    usage = getattr(result, "usage", None)
+    self.scheduler.settle("groq", tokens, usage.total_tokens if usage else None)
+    return result
+
+  async def step(self, message=""):
+    if message:
+      self.messages.append({"role": "user", "content": message})
+    self.compact()
+    with self.tracer.span("llm", model=self.model, messages=len(self.messages), native=True) as span:
+      recorded = self.replay()
+      if recorded is not None:
+        reply = json.loads(recorded)
+      else:
+        chat_completion = await self.ascheduled(lambda: self.client.chat.completions.create(**self.tool_request()))
+        self.record_usage(chat_completion.usage)
+        reply = tool_reply(chat_completion.choices[0].message)
+        self.record(json.dumps(reply))
+      span.update(self.usage[-1], tool_calls=len(reply.get("tool_calls", [])))
+    self.messages.append(reply)
+    return reply
@@ -0,0 +1,27 @@
+import os
+import sys
+import json
+import argparse
+import http.client
+
+# Thin client of `python main.py --serve`: only the standard library, so it starts in a few
+# milliseconds and the question goes to an agent that already has its clients and connections up.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send a question to a running `main.py --serve`")
+    parser.add_argument("question")
+    parser.add_argument("--server", default=os.environ.get("AGENT_SERVER", "127.0.0.1:8765"), help="HOST:PORT of the daemon")
+    args = parser.parse_args()
+
+    host, _, port = args.server.rpartition(":")
+    connection = http.client.HTTPConnection(host or "127.0.0.1", int(port))
+    try:
+        connection.request("POST", "/query", json.dumps({"question": args.question}), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+    except ConnectionRefusedError:
+        sys.exit("No agent listening on {}, start one with `python main.py --serve`".format(args.server))
+    if response.status != 200:
+        sys.exit("{} {}".format(response.status, response.reason))
+    for line in response:
+        sys.stdout.write(line.decode())
+        sys.stdout.flush()
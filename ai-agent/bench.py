@@ -0,0 +1,123 @@
+import io
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from groq import Groq, AsyncGroq
+
+import tools
+import main
+import runner
+from stubs import StubServer
+
+# Offline benchmark of the ReAct loop: the model and the tools are local stand-ins (stubs.py) with
+# configurable latency, so changes to the loop can be measured without network access or API keys.
+
+class CountingClient:
+    """Wraps a client to count the model calls (turns) of one query."""
+
+    def __init__(self, client):
+        self.client = client
+        self.turns = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        self.turns += 1
+        return self.client.chat.completions.create(**kwargs)
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values) + 0.5) - 1))]
+
+def summarize(concurrency, records, wall):
+    latencies = [r["seconds"] for r in records]
+    return {
+        "concurrency": concurrency,
+        "questions": len(records),
+        "errors": sum("error" in r for r in records),
+        "turns": round(statistics.mean(r.get("turns") or 0 for r in records), 2),
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "throughput": round(len(records) / wall, 2),
+    }
+
+def run_sync(client, questions, concurrency, stream, parallel):
+    """main.query on a thread pool, its per-iteration output is discarded."""
+    def answer(question):
+        counting = CountingClient(client)
+        start = time.perf_counter()
+        record = {"question": question}
+        try:
+            main.query(question, stream=stream, parallel=parallel, client=counting)
+        except Exception as e:
+            record["error"] = repr(e)
+        record.update(turns=counting.turns, seconds=time.perf_counter() - start)
+        return record
+
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(answer, questions))
+
+def run_async(client, questions, concurrency, parallel):
+    async def collect():
+        return [record async for record in runner.run(questions, concurrency, parallel=parallel, client=client)]
+    return asyncio.run(collect())
+
+def point_tools_at(url):
+    tools.WIKIPEDIA_URL = url + "/w/api.php"
+    tools.SERPER_URL = url + "/search"
+    tools.NEWSDATA_URL = url + "/api/1/latest"
+    os.environ.setdefault("SERPER_API_KEY", "stub")
+    os.environ.setdefault("NEWS_API_KEY", "stub")
+
+def benchmark(questions, levels, mode="sync", stream=False, parallel=False, **latencies):
+    stub = StubServer(**latencies).start()
+    point_tools_at(stub.url)
+    results = []
+    try:
+        for concurrency in levels:
+            start = time.perf_counter()
+            if mode == "async":
+                records = run_async(AsyncGroq(api_key="stub", base_url=stub.url), questions, concurrency, parallel)
+            else:
+                records = run_sync(Groq(api_key="stub", base_url=stub.url), questions, concurrency, stream, parallel)
+            results.append(summarize(concurrency, records, time.perf_counter() - start))
+    finally:
+        stub.stop()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop against local stand-in LLM and tool servers")
+    parser.add_argument("--questions", help="text or JSONL file with the questions, defaults to generated ones")
+    parser.add_argument("-n", type=int, default=50, help="number of generated questions")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated concurrency levels")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="main.query on threads or the asyncio runner")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--parallel", action="store_true")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="seconds per generated token")
+    parser.add_argument("--tool-latency", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON lines")
+    args = parser.parse_args()
+
+    if args.questions:
+        with open(args.questions) as f:
+            questions = list(runner.read_questions(f))
+    else:
+        questions = ["What is the capital of country {}?".format(i) for i in range(args.n)]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = benchmark(questions, levels, args.mode, args.stream, args.parallel,
+                        llm_latency=args.llm_latency, token_latency=args.token_latency, tool_latency=args.tool_latency)
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print("{:>11} {:>9} {:>6} {:>6} {:>7} {:>7} {:>7} {:>10}".format(
+            "concurrency", "questions", "errors", "turns", "p50", "p95", "p99", "q/s"))
+        for r in results:
+            print("{concurrency:>11} {questions:>9} {errors:>6} {turns:>6} {p50:>7} {p95:>7} {p99:>7} {throughput:>10}".format(**r))
@@ -0,0 +1,264 @@
+import os
+import re
+import sys
+import json
+import math
+import heapq
+import struct
+import argparse
+import tempfile
+import itertools
+from operator import itemgetter
+from collections import Counter
+import numpy as np
+
+# Offline stand-in for the wikipedia tool: a BM25 index over passages of a local dump, e.g. the
+# JSON lines written by `wikiextractor --json` ({"title": ..., "text": ...} per article).
+#
+# Index layout (all memory-mapped at query time):
+#   terms.bin        the terms, UTF-8, sorted and concatenated; term_offsets.bin has the byte
+#                    offset of each (uint64, one more than the terms) for the binary search
+#   vocab.bin        per term: byte offset and length in postings.bin, offset in tfs.bin, document frequency (uint64)
+#   postings.bin     passage ids of every term, delta + variable-byte encoded
+#   tfs.bin          term frequency of every posting (uint8, capped at 255)
+#   lengths.bin      passage lengths in tokens (uint32)
+#   passages.jsonl   the clean passages, offsets.bin has the byte offset of each line (uint64)
+#
+# The build takes bounded memory whatever the size of the dump: the postings are inverted in
+# blocks that are sorted by term, spilled to disk and merged at the end.
+
+STOPWORDS = set("a an and are as at be by for from has have he in is it its of on or she that the their this to was were which with".split())
+PASSAGE_WORDS = 100
+K1, B = 1.5, 0.75
+BLOCK_POSTINGS = 20_000_000  # postings inverted in memory before a block is written out
+BLOCK_HEADER = struct.Struct("<IQQII")  # term bytes, first and last passage id, df, gaps bytes
+
+def tokenize(text):
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+def clean(text):
+    """Drop the markup left in dumps and search snippets."""
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]", r"\1", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def passages(article):
+    """Split an article in passages of about PASSAGE_WORDS words, each prefixed with the title."""
+    words = clean(article.get("text", "")).split(" ")
+    for start in range(0, len(words), PASSAGE_WORDS):
+        chunk = " ".join(words[start:start + PASSAGE_WORDS])
+        if chunk:
+            yield "{}: {}".format(article.get("title", ""), chunk)
+
+def varbyte_encode(numbers):
+    out = bytearray()
+    for n in numbers:
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+    return out
+
+def varbyte_decode(data):
+    """Vectorized decode of a variable-byte encoded uint8 array."""
+    data = np.asarray(data)
+    last = (data & 0x80) == 0  # the last byte of each number has the high bit clear
+    ends = np.flatnonzero(last)
+    number = np.cumsum(last) - last  # which number every byte belongs to
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = 7 * (np.arange(len(data)) - starts[number])
+    return np.bincount(number, weights=(data & 0x7F).astype(np.float64) * 2.0 ** shift, minlength=len(ends)).astype(np.int64)
+
+def write_block(block, path):
+    """Write the postings of a block sorted by term: a header per term, then its gaps and tfs."""
+    with open(path, "wb") as f:
+        for term in sorted(block):
+            first, last, df, gaps, tfs = block[term]
+            f.write(BLOCK_HEADER.pack(len(term), first, last, df, len(gaps)))
+            f.write(term)
+            f.write(gaps)
+            f.write(tfs)
+
+def read_block(path):
+    """The (term, first id, last id, df, gaps after the first id, tfs) of a block, in term order."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if not header:
+                return
+            term_size, first, last, df, gaps_size = BLOCK_HEADER.unpack(header)
+            yield f.read(term_size), first, last, df, f.read(gaps_size), f.read(df)
+
+def merge_blocks(blocks, index_dir):
+    """Concatenate the postings of every term across the blocks (the passage ids of a block all
+    come after the ones of the previous block) into the index files, returns the number of terms."""
+    names = ("postings.bin", "tfs.bin", "terms.bin", "term_offsets.bin", "vocab.bin")
+    files = [open(os.path.join(index_dir, name), "wb") for name in names]
+    postings, tfs, terms, term_offsets, vocab = files
+    count = 0
+    try:
+        for term, records in itertools.groupby(heapq.merge(*map(read_block, blocks), key=itemgetter(0)), key=itemgetter(0)):
+            start, tfs_start, df, previous = postings.tell(), tfs.tell(), 0, 0
+            for _, first, last, n, gaps, term_tfs in records:
+                postings.write(varbyte_encode([first - previous]))
+                postings.write(gaps)
+                tfs.write(term_tfs)
+                df += n
+                previous = last
+            vocab.write(np.array([start, postings.tell() - start, tfs_start, df], dtype=np.uint64).tobytes())
+            term_offsets.write(np.uint64(terms.tell()).tobytes())
+            terms.write(term)
+            count += 1
+        term_offsets.write(np.uint64(terms.tell()).tobytes())
+    finally:
+        for f in files:
+            f.close()
+    return count
+
+def build(corpus, index_dir, block_postings=BLOCK_POSTINGS):
+    """Index a JSONL corpus into index_dir, returns the number of passages.
+
+    The postings are collected in blocks of about `block_postings`, each written sorted by term to
+    a temporary file, and the blocks are merged at the end, so the memory used doesn't grow with
+    the corpus.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    block = {}  # term -> [first passage id, last passage id, df, varbyte gaps, tfs]
+    size = count = 0
+    blocks = []
+    with tempfile.TemporaryDirectory(dir=index_dir) as tmp:
+        with open(corpus) as source, open(os.path.join(index_dir, "passages.jsonl"), "wb") as out, \
+                open(os.path.join(index_dir, "lengths.bin"), "wb") as lengths, \
+                open(os.path.join(index_dir, "offsets.bin"), "wb") as offsets:
+            for line in source:
+                if not line.strip():
+                    continue
+                for passage in passages(json.loads(line)):
+                    tokens = tokenize(passage)
+                    if not tokens:
+                        continue
+                    pid = count
+                    count += 1
+                    counts = Counter(tokens)
+                    for term, tf in counts.items():
+                        term = term.encode()
+                        entry = block.get(term)
+                        if entry is None:
+                            block[term] = [pid, pid, 1, bytearray(), bytearray([min(tf, 255)])]
+                        else:
+                            entry[3] += varbyte_encode([pid - entry[1]])
+                            entry[1] = pid
+                            entry[2] += 1
+                            entry[4].append(min(tf, 255))
+                    size += len(counts)
+                    lengths.write(struct.pack("<I", len(tokens)))
+                    offsets.write(struct.pack("<Q", out.tell()))
+                    out.write((json.dumps(passage, ensure_ascii=False) + "\n").encode())
+                    if size >= block_postings:
+                        blocks.append(os.path.join(tmp, "block-{:05d}.bin".format(len(blocks))))
+                        write_block(block, blocks[-1])
+                        block, size = {}, 0
+        if block or not blocks:
+            blocks.append(os.path.join(tmp, "block-{:05d}.bin".format(len(blocks))))
+            write_block(block, blocks[-1])
+        merge_blocks(blocks, index_dir)
+    return count
+
+def memmap(path, dtype=np.uint8, columns=None):
+    # np.memmap can't map an empty file
+    shape = (-1, columns) if columns else -1
+    if not os.path.getsize(path):
+        return np.zeros(0 if columns is None else (0, columns), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r").reshape(shape)
+
+class Index:
+    """A built index, memory-mapped so opening it is cheap and only the touched pages are read."""
+
+    def __init__(self, index_dir):
+        path = lambda name: os.path.join(index_dir, name)
+        self.terms = memmap(path("terms.bin"))
+        self.term_offsets = memmap(path("term_offsets.bin"), np.uint64)
+        self.vocab = memmap(path("vocab.bin"), np.uint64, columns=4)
+        self.postings = memmap(path("postings.bin"))
+        self.tfs = memmap(path("tfs.bin"))
+        self.lengths = memmap(path("lengths.bin"), np.uint32)
+        self.offsets = memmap(path("offsets.bin"), np.uint64)
+        self.text = memmap(path("passages.jsonl"))
+        self.avg_length = float(np.mean(self.lengths)) if len(self.lengths) else 0.0
+
+    def term(self, i):
+        return bytes(self.terms[int(self.term_offsets[i]):int(self.term_offsets[i + 1])])
+
+    def lookup(self, term):
+        """(posting offset, posting length, tfs offset, df) of a term, None if it isn't indexed,
+        by binary search of the sorted term table."""
+        key = term.encode()
+        low, high = 0, len(self.vocab)
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.vocab) and self.term(low) == key:
+            return [int(value) for value in self.vocab[low]]
+        return None
+
+    def search(self, query, k=3):
+        """The k best (score, passage) pairs for the query."""
+        ids, scores = [], []
+        n = len(self.lengths)
+        for term in set(tokenize(query)):
+            entry = self.lookup(term)
+            if entry is None:
+                continue
+            offset, size, posting, df = entry
+            pids = np.cumsum(varbyte_decode(self.postings[offset:offset + size]))
+            tf = self.tfs[posting:posting + df].astype(np.float32)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * self.lengths[pids] / self.avg_length)
+            ids.append(pids)
+            scores.append(idf * tf * (K1 + 1) / (tf + norm))
+        if not ids:
+            return []
+        pids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        best = np.argsort(-totals)[:k] if len(totals) <= k else np.argpartition(-totals, k)[:k]
+        best = best[np.argsort(-totals[best])]
+        return [(float(totals[i]), self.passage(int(pids[i]))) for i in best]
+
+    def passage(self, pid):
+        end = int(self.offsets[pid + 1]) if pid + 1 < len(self.offsets) else len(self.text)
+        return json.loads(bytes(self.text[int(self.offsets[pid]):end]))
+
+class LocalWikipedia:
+    """Drop-in for `tools.wikipedia` backed by a local index: wikipedia = LocalWikipedia("wiki-index")."""
+
+    def __init__(self, index_dir, k=2):
+        self.index = Index(index_dir)
+        self.k = k
+
+    def __call__(self, q):
+        results = self.index.search(q, self.k)
+        if not results:
+            return "No results for {}".format(q)
+        return "; ".join(passage for _, passage in results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query a local BM25 index for the wikipedia tool")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="index a JSONL dump ({\"title\", \"text\"} per line)")
+    build_parser.add_argument("corpus")
+    build_parser.add_argument("index_dir")
+    build_parser.add_argument("--block-postings", type=int, default=BLOCK_POSTINGS, help="postings held in memory before spilling a block")
+    search_parser = commands.add_parser("search")
+    search_parser.add_argument("index_dir")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print("Indexed {} passages".format(build(args.corpus, args.index_dir, args.block_postings)), file=sys.stderr)
+    else:
+        for score, passage in Index(args.index_dir).search(args.query, args.k):
+            print("{:.2f}\t{}".format(score, passage))
@@ -0,0 +1,94 @@
+import re
+import time
+import sqlite3
+import inspect
+import functools
+import threading
+from collections import Counter
+
+# How long (in seconds) a result stays fresh: news goes stale fast, encyclopedia entries don't
+DEFAULT_TTLS = {
+    "news": 15 * 60,
+    "google": 24 * 60 * 60,
+    "wikipedia": 30 * 24 * 60 * 60,
+    "search": 15 * 60,  # may be a news result
+}
+
+def normalize(query):
+    """Collapse the trivial differences the model produces for the same lookup ("France capital " vs "france Capital?")."""
+    return re.sub(r"\s+", " ", query).strip().strip("?.!\"'").lower()
+
+class ToolCache:
+    """Persistent LRU cache of tool results, kept in a SQLite file so warm restarts skip the network."""
+
+    def __init__(self, path="tool_cache.db", max_entries=10000, ttls=DEFAULT_TTLS, default_ttl=60 * 60):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                tool TEXT, query TEXT, value TEXT, expires REAL, accessed REAL,
+                PRIMARY KEY (tool, query)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.db.commit()
+
+    def get(self, tool, query):
+        """Returns the cached result or None, expired entries count as a miss."""
+        key, now = normalize(query), time.time()
+        with self.lock:
+            row = self.db.execute("SELECT value, expires FROM results WHERE tool = ? AND query = ?", (tool, key)).fetchone()
+            if row and row[1] > now:
+                self.db.execute("UPDATE results SET accessed = ? WHERE tool = ? AND query = ?", (now, tool, key))
+                self.db.commit()
+                self.stats[tool, "hits"] += 1
+                return row[0]
+            self.stats[tool, "misses"] += 1
+            return None
+
+    def put(self, tool, query, value):
+        now = time.time()
+        ttl = self.ttls.get(tool, self.default_ttl)
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (tool, normalize(query), value, now + ttl, now))
+            # evict the least recently used entries (and anything expired) beyond the size limit
+            self.db.execute("DELETE FROM results WHERE expires <= ?", (now,))
+            self.db.execute("""
+                DELETE FROM results WHERE rowid IN (
+                    SELECT rowid FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )""", (self.max_entries,))
+            self.db.commit()
+
+    def wrap(self, tool, fn):
+        """Put the cache in front of a tool function, sync or async."""
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def cached(query):
+                value = self.get(tool, query)
+                if value is None:
+                    value = await fn(query)
+                    self.put(tool, query, value)
+                return value
+        else:
+            @functools.wraps(fn)
+            def cached(query):
+                value = self.get(tool, query)
+                if value is None:
+                    value = fn(query)
+                    self.put(tool, query, value)
+                return value
+        return cached
+
+    def wrap_all(self, actions):
+        """Returns a copy of an actions table (e.g. `known_actions`) with every tool cached."""
+        return {tool: self.wrap(tool, fn) for tool, fn in actions.items()}
+
+    def summary(self):
+        return {tool: {"hits": self.stats[tool, "hits"], "misses": self.stats[tool, "misses"]}
+                for tool in sorted({tool for tool, _ in self.stats})}
+
+    def close(self):
+        self.db.close()
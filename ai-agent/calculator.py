@@ -0,0 +1,114 @@
+import ast
+import math
+import functools
+import numpy as np
+
+# Arithmetic for the `calculate` tool without eval() on what the model sends: the expression is
+# parsed, every node is checked against a whitelist and only then compiled, with no builtins and
+# only numpy functions in scope. Compiled expressions are cached, so the same formula asked again
+# (or evaluated over a batch of inputs) skips the parse.
+#
+#   evaluate("5.972e24 * 2")
+#   evaluate("sqrt(x ** 2 + y ** 2)", x=np.arange(1000), y=np.ones(1000))  # one call for the batch
+
+MAX_LENGTH = 1000  # characters of an expression
+MAX_NODES = 200  # AST nodes of an expression
+MAX_ELEMENTS = 1_000_000  # elements of the (broadcast) inputs
+# Numbers are float64, so no operation can grow without bound (9 ** 9 ** 9 is inf, not a huge int)
+# and the cost of an evaluation is known up front: at most nodes x elements operations.
+MAX_WORK = 50_000_000
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "inf": math.inf}
+
+FUNCTIONS = {
+    "abs": np.abs, "round": lambda x, digits=0: np.round(x, int(digits)), "floor": np.floor, "ceil": np.ceil,
+    "sqrt": np.sqrt, "exp": np.exp, "log": np.log, "log10": np.log10, "log2": np.log2,
+    "sin": np.sin, "cos": np.cos, "tan": np.tan, "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan,
+    "min": np.minimum, "max": np.maximum, "sum": np.sum, "mean": np.mean,
+}
+
+OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.UAdd, ast.USub)
+NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load, ast.Call, ast.List, ast.Tuple) + OPERATORS
+
+class CalculationError(ValueError):
+    pass
+
+class Numbers(ast.NodeTransformer):
+    """Turn the number literals into float64 constants and the list literals into arrays."""
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise CalculationError("Not a number: {!r}".format(node.value))
+        return ast.copy_location(ast.Call(ast.Name("float64", ast.Load()), [node], []), node)
+
+    def visit_List(self, node):
+        self.generic_visit(node)
+        return ast.copy_location(ast.Call(ast.Name("array", ast.Load()), [node], []), node)
+
+    visit_Tuple = visit_List
+
+@functools.lru_cache(maxsize=1024)
+def compile_expression(expression):
+    """Check and compile an expression, returns (code, names of its variables, node count)."""
+    if len(expression) > MAX_LENGTH:
+        raise CalculationError("Expression longer than {} characters".format(MAX_LENGTH))
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise CalculationError("Invalid expression: {}".format(e.msg))
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise CalculationError("Expression with more than {} nodes".format(MAX_NODES))
+    names = set()
+    for node in nodes:
+        if not isinstance(node, NODES):
+            raise CalculationError("Not allowed: {}".format(type(node).__name__))
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise CalculationError("Unknown function: {}".format(ast.unparse(node.func)))
+        elif isinstance(node, ast.Name) and node.id not in FUNCTIONS and node.id not in CONSTANTS:
+            names.add(node.id)
+    tree = ast.fix_missing_locations(Numbers().visit(tree))
+    return compile(tree, "<calculate>", "eval"), frozenset(names), len(nodes)
+
+def evaluate(expression, **variables):
+    """The value of an arithmetic expression, a number or a numpy array.
+
+    The variables can be numbers or arrays (the whole batch is computed in one pass).
+    """
+    code, names, size = compile_expression(expression)
+    missing = names - variables.keys()
+    if missing:
+        raise CalculationError("Unknown name: {}".format(", ".join(sorted(missing))))
+    scope = {name: np.asarray(value, dtype=np.float64) for name, value in variables.items() if name in names}
+    try:
+        # the inputs broadcast together, e.g. a column and a row make a whole table
+        elements = math.prod(np.broadcast_shapes(*(value.shape for value in scope.values())))
+    except ValueError as e:
+        raise CalculationError(str(e))
+    if elements > MAX_ELEMENTS:
+        raise CalculationError("Input with more than {} elements".format(MAX_ELEMENTS))
+    if size * elements > MAX_WORK:
+        raise CalculationError("Expression too expensive for an input of {} elements".format(elements))
+    with np.errstate(all="ignore"):
+        try:
+            result = eval(code, {"__builtins__": {}, "float64": np.float64, "array": np.array, **CONSTANTS, **FUNCTIONS}, scope)
+        except (TypeError, ValueError, OverflowError) as e:  # e.g. a function called with the wrong number of arguments, round(x, inf)
+            raise CalculationError(str(e))
+    result = np.asarray(result)
+    return result.item() if result.ndim == 0 else result
+
+def format_number(value):
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def calculate(what):
+    """The `calculate` tool: the result as text, or the error for the model to fix its expression."""
+    try:
+        value = evaluate(what)
+    except CalculationError as e:
+        return "Error: {}".format(e)
+    if isinstance(value, np.ndarray):
+        return "[{}]".format(", ".join(format_number(v) for v in value.ravel().tolist()))
+    return format_number(value)
@@ -0,0 +1,97 @@
+import os
+import time
+import random
+import asyncio
+import weakref
+import functools
+import httpx
+
+# Per-tool timeouts (seconds), a stuck request should fail fast and be retried rather than stall the loop
+TIMEOUTS = {
+    "wikipedia": httpx.Timeout(5.0, connect=3.0),
+    "google": httpx.Timeout(8.0, connect=3.0),
+    "news": httpx.Timeout(10.0, connect=3.0),
+}
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# set to a scheduler.Scheduler to share rate limits between concurrent queries
+scheduler = None
+
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+
+def http2_enabled():
+    """HTTP/2 is opt-in with TOOLS_HTTP2=1 and needs the `h2` package (pip install httpx[http2])."""
+    if os.getenv("TOOLS_HTTP2") != "1":
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+@functools.cache
+def client():
+    """The process-wide pooled client, connections are kept alive between tool calls."""
+    return httpx.Client(limits=LIMITS, http2=http2_enabled(), timeout=DEFAULT_TIMEOUT)
+
+# an AsyncClient is bound to the event loop it was first used in, so keep one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def async_client():
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = httpx.AsyncClient(limits=LIMITS, http2=http2_enabled(), timeout=DEFAULT_TIMEOUT)
+    return _async_clients[loop]
+
+def backoff(attempt, response=None):
+    """Seconds to wait before the next attempt: the server's Retry-After if it sent one, else full-jitter exponential backoff."""
+    retry_after = response is not None and response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def request(tool, method, url, **kwargs):
+    """Send a request for `tool` on the shared client, retrying transient failures. Raises on a final error status."""
+    kwargs.setdefault("timeout", TIMEOUTS.get(tool, DEFAULT_TIMEOUT))
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            send = lambda: client().request(method, url, **kwargs)
+            response = scheduler.run(tool, send) if scheduler else send()
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(backoff(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            response.raise_for_status()
+            return response
+        if response.status_code == 429 and scheduler:
+            continue  # the scheduler holds the provider back until it's allowed again
+        time.sleep(backoff(attempt, response))
+
+async def arequest(tool, method, url, **kwargs):
+    """Async version of `request`."""
+    kwargs.setdefault("timeout", TIMEOUTS.get(tool, DEFAULT_TIMEOUT))
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            send = lambda: async_client().request(method, url, **kwargs)
+            response = await (scheduler.arun(tool, send) if scheduler else send())
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(backoff(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            response.raise_for_status()
+            return response
+        if response.status_code == 429 and scheduler:
+            continue  # the scheduler holds the provider back until it's allowed again
+        await asyncio.sleep(backoff(attempt, response))
@@ -0,0 +1,114 @@
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# `python main.py --serve` keeps one process up with the groq/httpx clients, their open
+# connections, the tool cache and the pools loaded; `python ask.py "question"` sends it a question
+# and prints the progress of every iteration as it is streamed back.
+
+class ThreadStdout:
+    """sys.stdout that sends what each thread prints to its own target, the real stdout otherwise."""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def target(self):
+        return getattr(self.local, "target", None) or self.default
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.default, name)
+
+class ChunkedWriter:
+    """File-like end of a chunked HTTP response, one chunk per line printed."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.buffer = ""
+
+    def write(self, text):
+        self.buffer += text
+        if "\n" in self.buffer:
+            lines, self.buffer = self.buffer.rsplit("\n", 1)
+            self.send(lines + "\n")
+        return len(text)
+
+    def send(self, text):
+        data = text.encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.buffer:
+            self.send(self.buffer)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def serve(address, run_query):
+    """Answer POST /query {"question": ...} with `run_query(question)`, streaming what it prints."""
+    stdout = sys.stdout = ThreadStdout(sys.stdout)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self.send_error(404)
+            body = b"ok\n"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/query":
+                return self.send_error(404)
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                question = request["question"]
+            except (ValueError, KeyError, TypeError):
+                return self.send_error(400, "expected {\"question\": ...}")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            out = ChunkedWriter(self.wfile)
+            stdout.local.target = out
+            try:
+                run_query(question)
+            except (BrokenPipeError, ConnectionResetError):
+                # the client went away, the rest of its output has nowhere to go
+                self.close_connection = True
+                return
+            except Exception as e:
+                print("!! {}: {}".format(type(e).__name__, e))
+            finally:
+                stdout.local.target = None
+            out.close()
+
+        def log_message(self, format, *args):
+            print("{} - {}".format(self.address_string(), format % args), file=sys.stderr)
+
+    server = ThreadingHTTPServer(parse_address(address), Handler)
+    print("Serving on http://{}:{}".format(*server.server_address[:2]), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.stdout = stdout.default
@@ -1,10 +1,19 @@
 import os
-import sys
+import argparse
+import functools
 from groq import Groq
 from dotenv import load_dotenv
 import re
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 from agent import Agent
+from cache import ToolCache
+from recorder import Recorder
+from tracing import Tracer, NullTracer
+from observations import ObservationPipeline, raw
+from scheduler import Scheduler
+import clients
 from tools import *
 
 # Load environment variables from .env file
@@ -31,6 +40,10 @@ news:
 e.g. news: France
 Returns the latest of news about the France from NEWSDATA.IO. Use it when trying to get the realtime information!
 
+search:
+e.g. search: capital of China
+Searches wikipedia, google and the news at the same time and returns the most relevant results. Use it instead of trying them one by one!
+
 Always look things up on google if you have the opportunity to do so.
 
 Example session 1:
@@ -88,38 +101,210 @@ Thought: Okay, I finally got the capital of China!
 Answer: The capital of China is Beijing
 """.strip()
 
-action_re = re.compile('^Action: (\w+): (.*)$')
+# With native function calling the API describes the tools to the model, so the prompt only has to set the goal
+native_prompt = """
+Answer the question you are asked. Use the tools to look up what you don't know, you can call several tools at once
+when the lookups don't depend on each other. Always look things up on google if you have the opportunity to do so.
+When you have the answer, reply with it directly as "Answer: ...".
+""".strip()
+
+parallel_prompt = prompt + """
+
+You can run several independent actions in the same turn: write one Action line for each of them and then PAUSE.
+You will be called again with a single Observation that has the result of each action on its own line, prefixed with [action: input].
+"""
 
-client = Groq(
-    api_key=os.getenv('GROQ_API_KEY'),
-)
+action_re = re.compile('^Action: (\w+): (.*)$')
 
-def query(question, max_turns=10):
+# shared by all queries to run the actions of a turn concurrently
+tool_pool = ThreadPoolExecutor(max_workers=8)
+
+@functools.cache
+def default_client():
+    # created on first use so the prompt and helpers can be imported without an API key
+    return Groq(
+        api_key=os.getenv('GROQ_API_KEY'),
+    )
+
+def stream_reply(bot, message, on_action=None):
+    """Print the reply as it streams in.
+
+    Without `on_action` the reply is cut off once the first Action line is complete, otherwise
+    `on_action` is called with each Action match as soon as its line arrives.
+    """
+    lines = []
+    replies = bot.stream(message)
+    for line in replies:
+        print(line)
+        lines.append(line)
+        match = action_re.match(line)
+        if match and on_action:
+            on_action(match)
+        elif match:
+            # only the first action is run, so the rest of the reply isn't worth waiting for
+            replies.close()
+            break
+    return "\n".join(lines)
+
+def act(action, action_input, tracer=NullTracer()):
+    if action not in known_actions:
+        raise Exception("Unknown action: {}: {}".format(action, action_input))
+    with tracer.span("tool", tool=action, input_bytes=len(action_input)) as span:
+        observation = known_actions[action](action_input)
+        span["output_bytes"] = len(str(observation))
+    return observation
+
+def accept_reply(reply, messages):
+    """Whether a reply of the small model is good enough: it has an answer, or known actions
+    that weren't already run in this conversation (repeating one means it's going in circles)."""
+    actions = [match.groups() for match in map(action_re.match, reply.split('\n')) if match]
+    if not actions:
+        return "Answer" in reply
+    done = {match.groups() for message in messages if message["role"] == "assistant"
+            for match in map(action_re.match, message["content"].split('\n')) if match}
+    return all(action in known_actions and (action, action_input) not in done for action, action_input in actions)
+
+def combine_observations(actions, observations):
+    """Label each observation with the action it came from, so they can go back as one message."""
+    return "\n".join("[{}: {}] {}".format(action, action_input, observation)
+                     for (action, action_input), observation in zip(actions, observations))
+
+def query(question, max_turns=10, stream=False, parallel=False, token_budget=None, recorder=None, tracer=None,
+          small_model=None, native=False, compress=None, scheduler=None, client=None):
+    system = native_prompt if native else parallel_prompt if parallel else prompt
+    bot = Agent(client or default_client(), system, token_budget=token_budget, recorder=recorder, tracer=tracer,
+                small_model=small_model, accept=accept_reply, tools=tool_schemas if native else None, scheduler=scheduler)
+    try:
+        if native:
+            return react_native(bot, question, max_turns, compress or raw)
+        return react(bot, question, max_turns, stream, parallel, compress or raw)
+    finally:
+        if small_model:
+            print(">> Escalated to {}: {} of {} turns".format(bot.model, bot.escalations, len(bot.usage) - bot.escalations))
+        if tracer:
+            print(">> Trace summary:", tracer.summary())
+
+def react(bot, question, max_turns, stream, parallel, compress=raw):
+    """The Thought/Action/Observation loop, returns the final reply when there is an Answer.
+
+    Every tool output goes through `compress(observation, question)` before it is added to the prompt.
+    """
     i = 0
-    bot = Agent(client, prompt)
+    tracer = bot.tracer
     next_prompt = question
     while i < max_turns:
         i += 1
         print(f"======================================== Iterations {i} =============================================")
-        result = bot(next_prompt)
         print(">> Reasoning with the prompt/observation:")
-        print(result)
-          
-        actions = [action_re.match(a) for a in result.split('\n') if action_re.match(a)]
-        if actions:
-            action, action_input = actions[0].groups()
-            if action not in known_actions:
-                raise Exception("Unknown action: {}: {}".format(action, action_input))
-            print(">> Acting: {} {}".format(action, action_input))
-            observation = known_actions[action](action_input)
-            print(">> Observation:", observation)
-            next_prompt = "Observation: {}".format(observation)
-        elif "Answer" in result:
-            return 
-        else:
-            print(f"## Not found the related action and answer for the agent!")
-            return 
+        with tracer.span("turn", turn=i):
+            # in parallel mode the actions are started while the rest of the reply is still streaming
+            running = {}
+            def dispatch(match):
+                # an action started while streaming is seen again when the reply is parsed
+                if match.groups() not in running:
+                    running[match.groups()] = tool_pool.submit(act, *match.groups(), tracer)
+            if stream:
+                result = stream_reply(bot, next_prompt, on_action=dispatch if parallel else None)
+            else:
+                result = bot(next_prompt)
+                print(result)
+            print(">> Prompt tokens:", bot.usage[-1]["prompt_tokens"] or "~{}".format(bot.usage[-1]["estimated_prompt_tokens"]))
+
+            with tracer.span("parse"):
+                actions = [match for match in map(action_re.match, result.split('\n')) if match]
+            if actions and parallel:
+                for match in actions:
+                    dispatch(match)
+                    print(">> Acting: {} {}".format(*match.groups()))
+                observation = combine_observations(running.keys(), [compress(future.result(), question) for future in running.values()])
+                print(">> Observation:", observation)
+                next_prompt = "Observation:\n{}".format(observation)
+            elif actions:
+                action, action_input = actions[0].groups()
+                print(">> Acting: {} {}".format(action, action_input))
+                observation = compress(act(action, action_input, tracer), question)
+                print(">> Observation:", observation)
+                next_prompt = "Observation: {}".format(observation)
+            elif "Answer" in result:
+                return result
+            else:
+                print(f"## Not found the related action and answer for the agent!")
+                return 
           
+def tool_input(call):
+    return json.loads(call["function"]["arguments"] or "{}").get("query", "")
+
+def react_native(bot, question, max_turns, compress=raw):
+    """The same loop with the API's native tool calls: every call of a turn runs concurrently and
+    each result goes back as its own tool message, the turn without tool calls is the answer."""
+    message = question
+    for i in range(1, max_turns + 1):
+        print(f"======================================== Iterations {i} =============================================")
+        print(">> Reasoning with the prompt/observation:")
+        with bot.tracer.span("turn", turn=i):
+            reply = bot.step(message)
+            message = ""
+            print(reply["content"])
+            calls = reply.get("tool_calls", [])
+            if not calls:
+                return reply["content"]
+            running = [(call, tool_pool.submit(act, call["function"]["name"], tool_input(call), bot.tracer)) for call in calls]
+            results = []
+            for call, future in running:
+                print(">> Acting: {} {}".format(call["function"]["name"], tool_input(call)))
+                results.append((call["id"], compress(future.result(), question)))
+                print(">> Observation:", results[-1][1])
+            bot.add_tool_results(results)
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        query(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Answer a question with the ReAct agent")
+    parser.add_argument("question", nargs="?")
+    parser.add_argument("--max-turns", type=int, default=10)
+    parser.add_argument("--stream", action="store_true", help="stream the replies and run the action as soon as it is complete")
+    parser.add_argument("--parallel", action="store_true", help="run all the actions of a turn at the same time")
+    parser.add_argument("--cache", metavar="PATH", help="cache the tool results in this SQLite file")
+    parser.add_argument("--wikipedia-index", metavar="DIR", help="answer the wikipedia tool from a local BM25 index (see bm25.py)")
+    parser.add_argument("--token-budget", type=int, help="compact the conversation to keep the prompt under this many tokens")
+    parser.add_argument("--record", metavar="PATH", help="record the model completions in this SQLite file, or replay them from it")
+    parser.add_argument("--record-mode", choices=["record", "replay", "auto"], default="auto")
+    parser.add_argument("--native", action="store_true", help="use the API's function calling instead of the text Action protocol")
+    parser.add_argument("--observation-tokens", type=int, help="clean, dedupe and rank the tool output and cut it to this many tokens")
+    parser.add_argument("--small-model", help="try each turn on this model first (e.g. llama3-8b-8192), escalating when its reply is unusable")
+    parser.add_argument("--schedule", action="store_true", help="pace the LLM and tool calls by the rate limits in scheduler.py")
+    parser.add_argument("--trace", metavar="PATH", help="write the spans of the query as a Chrome trace (.json) or JSON lines")
+    parser.add_argument("--fan-out", action="store_true", help="split the question in independent sub-questions and research them at the same time")
+    parser.add_argument("--serve", metavar="HOST:PORT", nargs="?", const="127.0.0.1:8765",
+                        help="stay up and answer the questions sent by ask.py, with the clients and caches kept warm")
+    args = parser.parse_args()
+    if not args.question and not args.serve:
+        parser.error("a question is required unless --serve is used")
+    tracer = Tracer() if args.trace else None
+    scheduler = Scheduler() if args.schedule else None
+    # with a scheduler the 429s are retried by it, not separately by the groq client
+    client = Groq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0) if scheduler else None
+    clients.scheduler = scheduler
+    recorder = Recorder(args.record, args.record_mode) if args.record else None
+    if args.wikipedia_index:
+        from bm25 import LocalWikipedia
+        known_actions["wikipedia"] = LocalWikipedia(args.wikipedia_index)
+    if args.cache:
+        tool_cache = ToolCache(args.cache)
+        known_actions.update(tool_cache.wrap_all(known_actions))
+    options = dict(max_turns=args.max_turns, stream=args.stream, parallel=args.parallel, token_budget=args.token_budget,
+                   recorder=recorder, small_model=args.small_model, native=args.native,
+                   compress=ObservationPipeline(args.observation_tokens) if args.observation_tokens else None,
+                   scheduler=scheduler, client=client)
+    answer = query
+    if args.fan_out:
+        from planner import fan_out as answer
+    if args.serve:
+        from daemon import serve
+        options["client"] = client or default_client()
+        # the trace of each question ends with its summary, there is no file per question
+        serve(args.serve, lambda question: answer(question, tracer=Tracer() if args.trace else None, **options))
+    else:
+        answer(args.question, tracer=tracer, **options)
+        if args.cache:
+            print(">> Tool cache:", tool_cache.summary())
+        if args.trace:
+            tracer.write(args.trace)
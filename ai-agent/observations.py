@@ -0,0 +1,67 @@
+import re
+import html
+
+# Post-processing of the tool output before it goes into the prompt. Observations stay in the
+# history for the rest of the query, so every token cut here is saved again on every later turn.
+
+WORD_RE = re.compile(r"\w+")
+STOPWORDS = set("a an and are as at be by did do does for from has have how in is it of on or the to was what when where which who why with".split())
+
+def strip_markup(text):
+    """Remove the HTML of search snippets (e.g. wikipedia's <span class="searchmatch">) and entities."""
+    return re.sub(r"\s+", " ", html.unescape(re.sub(r"<[^>]+>", "", text))).strip()
+
+def words(text):
+    return {word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS}
+
+class ObservationPipeline:
+    """Strip markup, drop duplicate snippets, rank them by overlap with the question and cut to a token cap.
+
+    The tools join their snippets with `separator`, each stage can be turned off.
+    """
+
+    def __init__(self, max_tokens=200, strip=True, dedupe=True, rank=True, separator="; "):
+        self.max_tokens = max_tokens
+        self.strip = strip
+        self.dedupe = dedupe
+        self.rank = rank
+        self.separator = separator
+
+    def __call__(self, observation, question=""):
+        observation = str(observation)
+        if self.strip:
+            observation = strip_markup(observation)
+        snippets = [snippet.strip() for snippet in observation.split(self.separator) if snippet.strip()]
+        if self.dedupe:
+            seen, unique = set(), []
+            for snippet in snippets:
+                key = " ".join(WORD_RE.findall(snippet.lower()))
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(snippet)
+            snippets = unique
+        if self.rank and question:
+            asked = words(question)
+            # sorted() is stable, so snippets that tie keep the order the tool returned them in
+            snippets = sorted(snippets, key=lambda snippet: -len(asked & words(snippet)))
+        return self.cut(snippets)
+
+    def cut(self, snippets):
+        """Keep whole snippets while they fit in `max_tokens` (~4 characters each), truncate the first one if it doesn't."""
+        if not self.max_tokens:
+            return self.separator.join(snippets)
+        budget = self.max_tokens * 4
+        kept = []
+        for snippet in snippets:
+            size = len(snippet) + (len(self.separator) if kept else 0)
+            if size > budget:
+                if not kept:
+                    kept.append(snippet[:budget].rsplit(" ", 1)[0] + " ...")
+                break
+            kept.append(snippet)
+            budget -= size
+        return self.separator.join(kept)
+
+def raw(observation, question=""):
+    """No post-processing, the tool output goes in as it is."""
+    return observation
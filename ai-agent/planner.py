@@ -0,0 +1,97 @@
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from agent import Agent
+from daemon import ThreadStdout
+from tracing import NullTracer
+import main
+
+# Fan-out for questions made of independent parts ("compare the population of France and
+# Germany"): a planner call splits the question, one query loop per part runs at the same time
+# with its own conversation, and a last call combines their answers. The wall-clock time is
+# the slowest part instead of the sum of all of them.
+
+plan_prompt = """
+You split questions into independent sub-questions that can be researched separately.
+Reply with one line per sub-question, each starting with "Task: ", and nothing else.
+Each sub-question must make sense on its own, without the others.
+If the question can't be split, reply with a single Task line with the question itself.
+
+Example:
+
+Question: Which is older, the Eiffel Tower or the Statue of Liberty?
+Task: When was the Eiffel Tower built?
+Task: When was the Statue of Liberty built?
+""".strip()
+
+combine_prompt = """
+You answer a question from the answers already found for its sub-questions.
+Don't look anything up, only use these answers. Reply with "Answer: " followed by the answer.
+""".strip()
+
+task_re = re.compile(r"^Task: (.+)$", re.MULTILINE)
+answer_re = re.compile(r"Answer:\s*(.*)", re.DOTALL)
+
+MAX_TASKS = 4
+
+def plan(bot, question, max_tasks=MAX_TASKS):
+    """The sub-questions of `question`, just the question when it doesn't split."""
+    tasks = [task.strip() for task in task_re.findall(bot("Question: {}".format(question)))]
+    return tasks[:max_tasks] or [question]
+
+def answer_of(reply):
+    match = answer_re.search(reply or "")
+    return match.group(1).strip() if match else None
+
+def captured(fn, *args, **kwargs):
+    """Call `fn` with what it prints kept apart from the other threads, returns (result, output)."""
+    out = io.StringIO()
+    sys.stdout.local.target = out
+    try:
+        return fn(*args, **kwargs), out.getvalue()
+    except Exception as e:
+        return None, out.getvalue() + "!! {}: {}\n".format(type(e).__name__, e)
+    finally:
+        sys.stdout.local.target = None
+
+def fan_out(question, max_tasks=MAX_TASKS, client=None, recorder=None, tracer=None, scheduler=None, **options):
+    """`main.query` for each sub-question at the same time, then one call to combine the answers.
+
+    `options` are passed on to every `main.query`. Returns the combined reply.
+    """
+    client = client or main.default_client()
+    spans = tracer or NullTracer()
+    planner = Agent(client, plan_prompt, recorder=recorder, tracer=tracer, scheduler=scheduler)
+    with spans.span("plan"):
+        tasks = plan(planner, question, max_tasks)
+    if len(tasks) == 1:
+        return main.query(question, client=client, recorder=recorder, tracer=tracer, scheduler=scheduler, **options)
+    print(">> Plan:", "; ".join(tasks))
+
+    # each sub-query prints into its own buffer, shown in one block when it's done
+    installed = not isinstance(sys.stdout, ThreadStdout)
+    if installed:
+        sys.stdout = ThreadStdout(sys.stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            runs = [pool.submit(captured, main.query, task, client=client, recorder=recorder, tracer=tracer,
+                                scheduler=scheduler, **options) for task in tasks]
+            answers = []
+            for task, run in zip(tasks, runs):
+                reply, output = run.result()
+                print("######################################## Task: {} ########################################".format(task))
+                print(output, end="")
+                answers.append(answer_of(reply) or "not found")
+    finally:
+        if installed:
+            sys.stdout = sys.stdout.default
+
+    combiner = Agent(client, combine_prompt, recorder=recorder, tracer=tracer, scheduler=scheduler)
+    findings = "\n".join("- {} {}".format(task, answer) for task, answer in zip(tasks, answers))
+    with spans.span("combine"):
+        reply = combiner("Question: {}\nAnswers to the sub-questions:\n{}".format(question, findings))
+    print(">> Combined:")
+    print(reply)
+    return reply
@@ -0,0 +1,50 @@
+import json
+import sqlite3
+import hashlib
+import threading
+
+class ReplayMiss(Exception):
+    """Raised in replay mode when a conversation was never recorded."""
+
+class Recorder:
+    """Store of completions keyed by the model and the full message history.
+
+    Modes:
+      record - always call the model and (over)write the completion
+      replay - answer only from the store, a missing conversation raises ReplayMiss
+      auto   - answer from the store when possible, otherwise call the model and record it
+    """
+
+    def __init__(self, path="recordings.db", mode="auto"):
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError("Unknown recorder mode: {}".format(mode))
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, model TEXT, completion TEXT)")
+        self.db.commit()
+
+    @staticmethod
+    def key(model, messages):
+        payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def lookup(self, model, messages):
+        """Returns the recorded completion, or None when the model has to be called."""
+        if self.mode == "record":
+            return None
+        with self.lock:
+            row = self.db.execute("SELECT completion FROM completions WHERE key = ?", (self.key(model, messages),)).fetchone()
+        if row:
+            return row[0]
+        if self.mode == "replay":
+            raise ReplayMiss("No recording for this conversation ({} messages, model {})".format(len(messages), model))
+        return None
+
+    def save(self, model, messages, completion):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?)", (self.key(model, messages), model, completion))
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from groq import AsyncGroq
+from dotenv import load_dotenv
+
+from agent import AsyncAgent
+from cache import ToolCache
+from recorder import Recorder
+from observations import ObservationPipeline, raw
+from scheduler import Scheduler
+import clients
+from tools import async_known_actions, tool_schemas
+from main import prompt, parallel_prompt, native_prompt, action_re, combine_observations, accept_reply, tool_input
+
+# Load environment variables from .env file
+load_dotenv()
+
+async def aact(action, action_input):
+    if action not in async_known_actions:
+        raise Exception("Unknown action: {}: {}".format(action, action_input))
+    return await async_known_actions[action](action_input)
+
+async def aquery(client, question, max_turns=10, parallel=False, token_budget=None, recorder=None, small_model=None,
+                 native=False, compress=raw, scheduler=None):
+    """Async version of `main.query`, returns a result record instead of printing each iteration."""
+    system = native_prompt if native else parallel_prompt if parallel else prompt
+    bot = AsyncAgent(client, system, token_budget=token_budget, recorder=recorder,
+                     small_model=small_model, accept=accept_reply, tools=tool_schemas if native else None,
+                     scheduler=scheduler)
+    next_prompt = question
+    report = lambda answer, turns: {"question": question, "answer": answer, "turns": turns,
+                                    "usage": bot.usage, "escalations": bot.escalations}
+    if native:
+        for i in range(1, max_turns + 1):
+            reply = await bot.step(next_prompt)
+            next_prompt = ""
+            calls = reply.get("tool_calls", [])
+            if not calls:
+                return report(reply["content"].split("Answer:", 1)[-1].strip(), i)
+            observations = await asyncio.gather(*(aact(call["function"]["name"], tool_input(call)) for call in calls))
+            bot.add_tool_results((call["id"], compress(observation, question)) for call, observation in zip(calls, observations))
+        return report(None, max_turns)
+    for i in range(1, max_turns + 1):
+        result = await bot(next_prompt)
+        actions = [match.groups() for match in map(action_re.match, result.split('\n')) if match]
+        if actions and parallel:
+            actions = list(dict.fromkeys(actions))
+            observations = await asyncio.gather(*(aact(*action) for action in actions))
+            observations = [compress(observation, question) for observation in observations]
+            next_prompt = "Observation:\n{}".format(combine_observations(actions, observations))
+        elif actions:
+            observation = compress(await aact(*actions[0]), question)
+            next_prompt = "Observation: {}".format(observation)
+        elif "Answer" in result:
+            return report(result.split("Answer:", 1)[-1].strip(), i)
+        else:
+            return report(None, i)
+    return report(None, max_turns)
+
+async def run(questions, concurrency=16, max_turns=10, parallel=False, token_budget=None, recorder=None, small_model=None,
+              native=False, compress=raw, scheduler=None, client=None):
+    """Answer `questions` with at most `concurrency` in flight, yielding each result as soon as it finishes.
+
+    `questions` can be any iterable (e.g. a generator over a JSONL file), it is consumed lazily
+    so only `concurrency` questions are held in memory at a time.
+    """
+    # with a scheduler the 429s are retried by it, not separately by the groq client
+    client = client or AsyncGroq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0 if scheduler else 2)
+
+    async def answer(question):
+        start = time.perf_counter()
+        try:
+            record = await aquery(client, question, max_turns, parallel, token_budget, recorder, small_model, native, compress,
+                                 scheduler)
+        except Exception as e:
+            record = {"question": question, "answer": None, "error": repr(e)}
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    questions = iter(questions)
+    pending = set()
+    for question in questions:
+        pending.add(asyncio.create_task(answer(question)))
+        if len(pending) >= concurrency:
+            break
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
+            # refill the pool with the next question
+            question = next(questions, None)
+            if question is not None:
+                pending.add(asyncio.create_task(answer(question)))
+
+def read_questions(lines):
+    """Questions are either plain text lines or JSON objects with a "question" field."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        yield json.loads(line)["question"] if line.startswith("{") else line
+
+async def main(args):
+    scheduler = Scheduler() if args.schedule else None
+    clients.scheduler = scheduler
+    recorder = Recorder(args.record, args.record_mode) if args.record else None
+    if args.wikipedia_index:
+        from bm25 import LocalWikipedia
+        local_wikipedia = LocalWikipedia(args.wikipedia_index)
+        async def wikipedia(q):
+            return local_wikipedia(q)
+        async_known_actions["wikipedia"] = wikipedia
+    if args.cache:
+        tool_cache = ToolCache(args.cache)
+        async_known_actions.update(tool_cache.wrap_all(async_known_actions))
+    source = open(args.questions) if args.questions != "-" else sys.stdin
+    with source:
+        records = run(read_questions(source), args.concurrency, args.max_turns, parallel=args.parallel,
+                      token_budget=args.token_budget, recorder=recorder, small_model=args.small_model, native=args.native,
+                      compress=ObservationPipeline(args.observation_tokens) if args.observation_tokens else raw,
+                      scheduler=scheduler)
+        async for record in records:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    if args.cache:
+        print("tool cache:", tool_cache.summary(), file=sys.stderr)
+    if scheduler:
+        print("scheduler:", scheduler.summary(), file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a batch of questions concurrently, one JSON line per result")
+    parser.add_argument("questions", help="text or JSONL file with the questions, '-' for stdin")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-turns", type=int, default=10)
+    parser.add_argument("--parallel", action="store_true", help="run all the actions of a turn at the same time")
+    parser.add_argument("--cache", metavar="PATH", help="cache the tool results in this SQLite file")
+    parser.add_argument("--wikipedia-index", metavar="DIR", help="answer the wikipedia tool from a local BM25 index (see bm25.py)")
+    parser.add_argument("--token-budget", type=int, help="compact each conversation to keep the prompt under this many tokens")
+    parser.add_argument("--record", metavar="PATH", help="record the model completions in this SQLite file, or replay them from it")
+    parser.add_argument("--record-mode", choices=["record", "replay", "auto"], default="auto")
+    parser.add_argument("--native", action="store_true", help="use the API's function calling instead of the text Action protocol")
+    parser.add_argument("--observation-tokens", type=int, help="clean, dedupe and rank the tool output and cut it to this many tokens")
+    parser.add_argument("--schedule", action="store_true", help="share the rate limits in scheduler.py between all the questions")
+    parser.add_argument("--small-model", help="try each turn on this model first (e.g. llama3-8b-8192), escalating when its reply is unusable")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,202 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+
+# Requests and tokens per minute of each provider, adjust them to your plan. The LLM calls
+# are scheduled as "groq", the tools under their own name.
+DEFAULT_LIMITS = {
+    "groq": {"rpm": 30, "tpm": 6000, "max_concurrency": 8},
+    "wikipedia": {"rpm": 200, "max_concurrency": 16},
+    "google": {"rpm": 100, "max_concurrency": 8},
+    "news": {"rpm": 30, "max_concurrency": 4},
+}
+
+# how often a waiting request checks again when it isn't woken up (async waiters always poll)
+POLL_INTERVAL = 0.01
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, up to one minute of burst."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` is available (a request bigger than the bucket only waits for a full one)."""
+        self.refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+class Provider:
+    def __init__(self, rpm=None, tpm=None, max_concurrency=8):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency  # adapted to the 429s: halved on each, +1 after a window of successes
+        self.successes = 0
+        self.in_flight = 0
+        self.blocked_until = 0.0  # set from Retry-After
+        self.waiting = []  # heap of (priority, ticket)
+
+def status_of(outcome):
+    """HTTP status and Retry-After of a response, or of an exception carrying one (httpx, groq)."""
+    response = getattr(outcome, "response", outcome)
+    status = getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    return status, headers.get("retry-after")
+
+class Scheduler:
+    """Shares the rate limits of each provider between every concurrent query.
+
+    A request waits for a slot: its turn in the provider's priority queue (lower goes first), a
+    free request and its estimated tokens in the token buckets, and room under the provider's
+    concurrency limit. A 429 halves that limit and, with Retry-After, holds the whole provider
+    back instead of every caller retrying on its own. Works from threads and from asyncio.
+    """
+
+    def __init__(self, limits=DEFAULT_LIMITS):
+        self.providers = {name: Provider(**limit) for name, limit in limits.items()}
+        self.lock = threading.Condition()
+        self.tickets = itertools.count()
+        self.stats = {name: {"requests": 0, "throttled": 0, "waited": 0.0} for name in limits}
+
+    def wait_time(self, provider, ticket, tokens):
+        """0 when the slot is granted (and taken), otherwise how long to wait before trying again."""
+        if provider.waiting[0][1] != ticket:
+            return POLL_INTERVAL
+        wait = max(provider.blocked_until - time.monotonic(), 0.0)
+        if provider.requests:
+            wait = max(wait, provider.requests.wait_time(1))
+        if provider.tokens:
+            wait = max(wait, provider.tokens.wait_time(tokens))
+        if provider.in_flight >= provider.concurrency:
+            wait = max(wait, POLL_INTERVAL)
+        if wait > 0:
+            return wait
+        heapq.heappop(provider.waiting)
+        if provider.requests:
+            provider.requests.take(1)
+        if provider.tokens:
+            provider.tokens.take(tokens)
+        provider.in_flight += 1
+        return 0
+
+    def acquire(self, name, tokens=1, priority=0):
+        provider = self.providers[name]
+        start = time.monotonic()
+        with self.lock:
+            ticket = next(self.tickets)
+            heapq.heappush(provider.waiting, (priority, ticket))
+            while True:
+                wait = self.wait_time(provider, ticket, tokens)
+                if not wait:
+                    break
+                self.lock.wait(wait)
+            self.lock.notify_all()
+            self.stats[name]["waited"] += time.monotonic() - start
+
+    async def aacquire(self, name, tokens=1, priority=0):
+        provider = self.providers[name]
+        start = time.monotonic()
+        with self.lock:
+            ticket = next(self.tickets)
+            heapq.heappush(provider.waiting, (priority, ticket))
+        try:
+            while True:
+                with self.lock:
+                    wait = self.wait_time(provider, ticket, tokens)
+                    if not wait:
+                        self.lock.notify_all()
+                        self.stats[name]["waited"] += time.monotonic() - start
+                        return
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # leave the queue, or everyone behind this ticket would wait forever
+            with self.lock:
+                provider.waiting.remove((priority, ticket))
+                heapq.heapify(provider.waiting)
+                self.lock.notify_all()
+            raise
+
+    def release(self, name, outcome=None):
+        """Give the slot back and adapt the provider to the response (or exception) the request ended with."""
+        provider = self.providers[name]
+        status, retry_after = status_of(outcome)
+        with self.lock:
+            provider.in_flight -= 1
+            self.stats[name]["requests"] += 1
+            if status == 429:
+                self.stats[name]["throttled"] += 1
+                provider.concurrency = max(1, provider.concurrency // 2)
+                provider.successes = 0
+                try:
+                    pause = float(retry_after) if retry_after else 1.0
+                except ValueError:
+                    pause = 1.0
+                provider.blocked_until = max(provider.blocked_until, time.monotonic() + pause)
+            elif provider.concurrency < provider.max_concurrency:
+                provider.successes += 1
+                if provider.successes >= provider.concurrency:
+                    provider.concurrency += 1
+                    provider.successes = 0
+            self.lock.notify_all()
+
+    def settle(self, name, estimated, used):
+        """Correct the token bucket once the real usage of a request is known."""
+        provider = self.providers[name]
+        if provider.tokens and used is not None:
+            with self.lock:
+                provider.tokens.level -= used - estimated
+
+    def run(self, name, fn, tokens=1, priority=0, retries=0):
+        """Call `fn` in a slot of provider `name`, retrying up to `retries` times when it raises a 429."""
+        if name not in self.providers:
+            return fn()
+        for attempt in range(retries + 1):
+            self.acquire(name, tokens, priority)
+            # the slot goes back however fn ends, a cancellation (a BaseException) included
+            outcome = None
+            try:
+                outcome = fn()
+            except BaseException as e:
+                outcome = e
+                if status_of(e)[0] == 429 and attempt < retries:
+                    continue
+                raise
+            finally:
+                self.release(name, outcome)
+            return outcome
+
+    async def arun(self, name, fn, tokens=1, priority=0, retries=0):
+        """Async version of `run`, `fn` returns an awaitable."""
+        if name not in self.providers:
+            return await fn()
+        for attempt in range(retries + 1):
+            await self.aacquire(name, tokens, priority)
+            # the slot goes back however fn ends, a cancellation (a BaseException) included
+            outcome = None
+            try:
+                outcome = await fn()
+            except BaseException as e:
+                outcome = e
+                if status_of(e)[0] == 429 and attempt < retries:
+                    continue
+                raise
+            finally:
+                self.release(name, outcome)
+            return outcome
+
+    def summary(self):
+        return {name: dict(stats, waited=round(stats["waited"], 3), concurrency=self.providers[name].concurrency)
+                for name, stats in self.stats.items() if stats["requests"]}
@@ -0,0 +1,160 @@
+import json
+import time
+import random
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Replies of the stand-in model, one per turn, formatted with the question
+DEFAULT_SCRIPT = [
+    "Thought: I should look up {question} on Wikipedia\nAction: wikipedia: {question}\nPAUSE",
+    "Thought: That's not enough, let me try google\nAction: google: {question}\nPAUSE",
+    "Thought: I've got it\n\nAnswer: This is the answer to {question}",
+]
+
+class StubServer:
+    """Local stand-ins for the OpenAI-compatible chat endpoint and the wikipedia/serper/newsdata APIs.
+
+    Every response is delayed to mimic the real services: the model takes `llm_latency` seconds
+    before the first token plus `token_latency` per token, the tools take `tool_latency`, all
+    varied by +/- `jitter` (a fraction).
+    """
+
+    def __init__(self, llm_latency=0.3, token_latency=0.002, tool_latency=0.2, jitter=0.2, script=DEFAULT_SCRIPT, port=0):
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.tool_latency = tool_latency
+        self.jitter = jitter
+        self.script = script
+        self.requests = {"chat": 0, "wikipedia": 0, "google": 0, "news": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, endpoint):
+        with self.lock:
+            self.requests[endpoint] += 1
+
+    def delay(self, seconds):
+        time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def reply(self, body):
+        """The scripted reply for this point of the conversation, cut at the stop word like the real API."""
+        messages = body["messages"]
+        question = next(m["content"] for m in messages if m["role"] == "user")
+        turn = sum(m["role"] == "assistant" for m in messages)
+        content = self.script[min(turn, len(self.script) - 1)].format(question=question)
+        stop = body.get("stop")
+        for word in [stop] if isinstance(stop, str) else stop or []:
+            content = content.split(word)[0]
+        return content
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client stopped reading early, e.g. right after an Action line
+                    pass
+
+            def send_json(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def read_json(self):
+                return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                q = parse_qs(url.query)
+                if url.path.endswith("/w/api.php"):
+                    stub.count("wikipedia")
+                    stub.delay(stub.tool_latency)
+                    term = q.get("srsearch", [""])[0]
+                    self.send_json({"query": {"search": [{"snippet": "<span class=\"searchmatch\">{}</span> is a stub article".format(term)}]}})
+                elif url.path.endswith("/api/1/latest"):
+                    stub.count("news")
+                    stub.delay(stub.tool_latency)
+                    term = q.get("q", [""])[0]
+                    self.send_json({"results": [{"description": "News {} about {}".format(i, term)} for i in range(5)]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                body = self.read_json()
+                if self.path.endswith("/chat/completions"):
+                    stub.count("chat")
+                    self.chat(body)
+                elif self.path.endswith("/search"):
+                    stub.count("google")
+                    stub.delay(stub.tool_latency)
+                    self.send_json({"organic": [{"snippet": "Result {} for {}".format(i, body.get("q"))} for i in range(5)]})
+                else:
+                    self.send_error(404)
+
+            def chat(self, body):
+                content = stub.reply(body)
+                tokens = content.split(" ")
+                prompt_tokens = sum(len(m.get("content") or "") for m in body["messages"]) // 4
+                completion = {
+                    "id": "stub", "created": int(time.time()), "model": body["model"],
+                    "system_fingerprint": None,
+                }
+                stub.delay(stub.llm_latency)
+                if not body.get("stream"):
+                    time.sleep(stub.token_latency * len(tokens))
+                    return self.send_json(dict(completion, object="chat.completion", choices=[{
+                        "index": 0, "finish_reason": "stop", "logprobs": None,
+                        "message": {"role": "assistant", "content": content},
+                    }], usage={
+                        "prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                        "total_tokens": prompt_tokens + len(tokens),
+                    }))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    time.sleep(stub.token_latency)
+                    self.send_event(dict(completion, object="chat.completion.chunk", choices=[{
+                        "index": 0, "finish_reason": None,
+                        "delta": {"role": "assistant", "content": token if i == 0 else " " + token},
+                    }]))
+                self.send_event(dict(completion, object="chat.completion.chunk", choices=[{
+                    "index": 0, "finish_reason": "stop", "delta": {},
+                }]))
+                self.send_chunk(b"data: [DONE]\n\n")
+                self.send_chunk(b"")
+
+            def send_event(self, payload):
+                self.send_chunk("data: {}\n\n".format(json.dumps(payload)).encode())
+
+            def send_chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
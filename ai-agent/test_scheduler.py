@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from scheduler import Scheduler
+
+# python -m pytest test_scheduler.py
+
+def test_cancelled_arun_releases_its_slot():
+    scheduler = Scheduler({"slow": {"max_concurrency": 1}})
+
+    async def cancel_in_flight():
+        task = asyncio.ensure_future(scheduler.arun("slow", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.05)
+        assert scheduler.providers["slow"].in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # the only slot is free again, the next request doesn't hang
+        return await asyncio.wait_for(scheduler.arun("slow", lambda: asyncio.sleep(0, "done")), 1)
+
+    assert asyncio.run(cancel_in_flight()) == "done"
+    assert scheduler.providers["slow"].in_flight == 0
+
+def test_interrupted_run_releases_its_slot():
+    scheduler = Scheduler({"slow": {"max_concurrency": 1}})
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        scheduler.run("slow", interrupted)
+    assert scheduler.providers["slow"].in_flight == 0
+
+def test_async_search_leaves_no_slot_held(monkeypatch):
+    import clients
+    import tools
+    from stubs import StubServer
+
+    stub = StubServer(tool_latency=0.05, jitter=0).start()
+    monkeypatch.setattr(tools, "WIKIPEDIA_URL", stub.url + "/w/api.php")
+    monkeypatch.setattr(tools, "SERPER_URL", stub.url + "/search")
+    monkeypatch.setattr(tools, "NEWSDATA_URL", stub.url + "/api/1/latest")
+    monkeypatch.setenv("SERPER_API_KEY", "stub")
+    monkeypatch.setenv("NEWS_API_KEY", "stub")
+    monkeypatch.setattr(clients, "scheduler", Scheduler())
+
+    async def searches():
+        # the first good backend wins and the slower requests are cancelled
+        results = await asyncio.gather(*(tools.async_search("France capital") for _ in range(40)))
+        await asyncio.sleep(0.2)
+        return results, await asyncio.wait_for(tools.async_wikipedia("Paris"), 3)
+
+    try:
+        results, paris = asyncio.run(searches())
+    finally:
+        stub.stop()
+    assert all(result.startswith("[") for result in results)
+    assert "Paris" in paris
+    assert {name: provider.in_flight for name, provider in clients.scheduler.providers.items()} == dict.fromkeys(clients.scheduler.providers, 0)
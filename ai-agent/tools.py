@@ -1,26 +1,34 @@
-import httpx
-import requests
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from dotenv import load_dotenv
-import json
-from datetime import datetime, timedelta
+
+from clients import request, arequest
+from observations import strip_markup, words
 
 # Load environment variables from .env file
 load_dotenv()
 
-def wikipedia(q):
-    return httpx.get("https://en.wikipedia.org/w/api.php", params={
+# Each tool is split in the request to send and how to read its response, so the sync and
+# async versions share everything but the transport (see clients.py)
+
+# overridable so the tools can be pointed at local stand-ins (see bench.py)
+WIKIPEDIA_URL = os.getenv("WIKIPEDIA_URL", "https://en.wikipedia.org/w/api.php")
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+NEWSDATA_URL = os.getenv("NEWSDATA_URL", "https://newsdata.io/api/1/latest")
+
+def wikipedia_request(q):
+    return "GET", WIKIPEDIA_URL, {"params": {
         "action": "query",
         "list": "search",
         "srsearch": q,
         "format": "json"
-    }).json()["query"]["search"][0]["snippet"]
-
-def calculate(what):
-    return eval(what)
+    }}
 
+def wikipedia_result(response):
+    return response.json()["query"]["search"][0]["snippet"]
 
-def google(query):
+def google_request(query):
     headers = {
         'X-API-KEY': os.environ['SERPER_API_KEY'],
         'Content-Type': 'application/json',
@@ -29,35 +37,156 @@ def google(query):
         'q': query,
         'num': 5  # Number of search results to return
     }
-    response = requests.post("https://google.serper.dev/search", json=payload, headers=headers)
-    if response.status_code == 200:
-      # for idx, result in enumerate(results.get('organic', []), start=1):
-        rets = []
-        for idx, result in enumerate(response.json().get('organic', []), start=1):
-          rets.append(result.get('snippet'))
-        return "; ".join(rets)
-    else:
-        response.raise_for_status()
+    return "POST", SERPER_URL, {"json": payload, "headers": headers}
+
+def google_result(response):
+    return "; ".join(result.get('snippet') for result in response.json().get('organic', []))
+
+def news_request(query):
+    param = {
+        "q": query,
+        "size": 5,
+        "apikey": os.environ['NEWS_API_KEY']
+    }
+    return "GET", NEWSDATA_URL, {"params": param}
+
+def news_result(response):
+    return "; ".join(result.get('description') or "" for result in response.json().get('results', []))
+
+def calculate(what):
+    # numpy is only needed once something is calculated
+    from calculator import calculate
+    return calculate(what)
+
+def wikipedia(q):
+    method, url, kwargs = wikipedia_request(q)
+    return wikipedia_result(request("wikipedia", method, url, **kwargs))
+
+def google(query):
+    method, url, kwargs = google_request(query)
+    return google_result(request("google", method, url, **kwargs))
 
 def news(query):
-  param = {
-    "q": query,
-    "size": 5,
-    "apikey": os.environ['NEWS_API_KEY']
-  }
-
-  response = requests.get("https://newsdata.io/api/1/latest",  params=param)
-
-  if response.status_code == 200:
-      rets = []
-      for idx, result in enumerate(response.json().get('results', []), start=1):
-        rets.append(result.get('description'))
-      return "; ".join(rets)
-  else:
-      return response.raise_for_status()
+    method, url, kwargs = news_request(query)
+    return news_result(request("news", method, url, **kwargs))
+
+# Async variants of the tools, used by the concurrent runner (runner.py)
+async def async_wikipedia(q):
+    method, url, kwargs = wikipedia_request(q)
+    return wikipedia_result(await arequest("wikipedia", method, url, **kwargs))
+
+async def async_google(query):
+    method, url, kwargs = google_request(query)
+    return google_result(await arequest("google", method, url, **kwargs))
+
+async def async_news(query):
+    method, url, kwargs = news_request(query)
+    return news_result(await arequest("news", method, url, **kwargs))
     
 known_actions = {
     "wikipedia": wikipedia,
     "google": google,
     "news": news
-}
\ No newline at end of file
+}
+
+async_known_actions = {
+    "wikipedia": async_wikipedia,
+    "google": async_google,
+    "news": async_news
+}
+
+# `search` asks every backend at once instead of one per turn. The first result that covers at
+# least SEARCH_THRESHOLD of the query's words wins and the slower requests are dropped; when none
+# does, the results are merged, best first. Either way each result is tagged with its backend.
+SEARCH_BACKENDS = ["wikipedia", "google", "news"]
+SEARCH_THRESHOLD = 0.6
+
+# big enough for a few searches in flight, the requests left behind by a winner finish here
+search_pool = ThreadPoolExecutor(max_workers=12)
+
+def relevance(query, result):
+    """Share of the query's words found in the result."""
+    asked = words(query)
+    return len(asked & words(strip_markup(str(result)))) / len(asked) if asked else 0.0
+
+def label(backend, result):
+    """The result tagged with the backend that gave it, the same for a winner and a merge."""
+    return "[{}] {}".format(backend, result)
+
+def merge(query, results, errors):
+    if not results:
+        if errors:
+            raise errors[0]
+        return "No results for {}".format(query)
+    ranked = sorted(results.items(), key=lambda item: -relevance(query, item[1]))
+    return "; ".join(label(backend, result) for backend, result in ranked)
+
+def search(query, actions=None):
+    actions = actions or known_actions  # looked up on each call so a cache or local index applies to the backends
+    pending = {search_pool.submit(actions[backend], query): backend for backend in SEARCH_BACKENDS}
+    results, errors = {}, []
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            backend = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:  # a missing API key or no hit, the other backends may still answer
+                errors.append(e)
+                continue
+            if result and relevance(query, result) >= SEARCH_THRESHOLD:
+                # a running request can't be interrupted, it is just not waited for
+                for other in pending:
+                    other.cancel()
+                return label(backend, result)
+            if result:
+                results[backend] = result
+    return merge(query, results, errors)
+
+async def async_search(query, actions=None):
+    actions = actions or async_known_actions
+    pending = {asyncio.ensure_future(actions[backend](query)): backend for backend in SEARCH_BACKENDS}
+    results, errors = {}, []
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                backend = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if result and relevance(query, result) >= SEARCH_THRESHOLD:
+                    return label(backend, result)
+                if result:
+                    results[backend] = result
+    finally:
+        for task in pending:
+            task.cancel()
+    return merge(query, results, errors)
+
+known_actions["search"] = search
+async_known_actions["search"] = async_search
+
+def tool_schema(name, description):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {"query": {"type": "string", "description": "What to search for"}},
+                "required": ["query"],
+            },
+        },
+    }
+
+# The same tools as JSON-schema functions, for the native function-calling mode of the agent
+tool_schemas = [
+    tool_schema("wikipedia", "Returns a summary from searching Wikipedia"),
+    tool_schema("google", "Returns the top results from searching Google"),
+    tool_schema("news", "Returns the latest news about the query from NEWSDATA.IO, use it for realtime information"),
+    tool_schema("search", "Searches Wikipedia, Google and the news at the same time and returns the most relevant results"),
+]
@@ -0,0 +1,62 @@
+import os
+import json
+import time
+import threading
+import contextlib
+from collections import defaultdict
+
+class Tracer:
+    """Collects timed spans (LLM calls, tool calls, parsing) of a query.
+
+    Each span is a dict with its name, start/end (seconds since the tracer was created) and
+    whatever attributes the caller adds: token usage for the model, payload sizes for the tools.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """Time the block, the yielded dict can be updated with attributes known only at the end."""
+        start = time.perf_counter() - self.origin
+        try:
+            yield attrs
+        finally:
+            end = time.perf_counter() - self.origin
+            with self.lock:
+                self.spans.append({"name": name, "start": start, "end": end, "thread": threading.get_ident(), **attrs})
+
+    def summary(self):
+        """Count, total seconds and token/payload totals per span name."""
+        totals = defaultdict(lambda: defaultdict(float))
+        for span in self.spans:
+            total = totals[span["name"]]
+            total["count"] += 1
+            total["seconds"] += span["end"] - span["start"]
+            for key in ("prompt_tokens", "completion_tokens", "input_bytes", "output_bytes"):
+                if span.get(key):
+                    total[key] += span[key]
+        return {name: {key: round(value, 3) if key == "seconds" else int(value) for key, value in total.items()}
+                for name, total in totals.items()}
+
+    def write(self, path):
+        """Chrome trace format (chrome://tracing, Perfetto) for .json files, JSON lines otherwise."""
+        with open(path, "w") as f:
+            if os.path.splitext(path)[1] == ".json":
+                json.dump({"traceEvents": [{
+                    "name": span["name"], "ph": "X", "pid": os.getpid(), "tid": span["thread"],
+                    "ts": span["start"] * 1e6, "dur": (span["end"] - span["start"]) * 1e6,
+                    "args": {k: v for k, v in span.items() if k not in ("name", "start", "end", "thread")},
+                } for span in self.spans]}, f)
+            else:
+                for span in self.spans:
+                    f.write(json.dumps(span) + "\n")
+
+class NullTracer:
+    """Stands in when tracing is off."""
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        yield attrs
@@ -0,0 +1,132 @@
+import pygame
+import numpy as np
+
+# Population chart drawn incrementally, so a frame costs the same at month 10 and at month
+# 100000: the gradient background is drawn once, the lines go on a surface that only gets the
+# new segments, and the maxima are kept as the history grows. The whole surface is redrawn
+# only when the scale changes: the x axis doubles its capacity when full and the y axis leaves
+# some headroom above the maximum, so that happens a logarithmic number of times. Once there are
+# more months than pixels, a redraw downsamples the lines with LTTB.
+
+AXIS_COLOR = (150, 150, 150)  # Soft gray for axes
+TITLE_COLOR = (50, 50, 50)  # Darker gray for better contrast
+GRADIENT_START = (245, 245, 245)  # Light gray
+GRADIENT_END = (255, 255, 255)  # White
+LINE_WIDTH = 3
+MIN_TICK_SPACING = 4  # pixels, the month ticks are left out when closer than this
+Y_HEADROOM = 1.25
+
+
+def lttb(values, n):
+    """Indexes of the `n` points of `values` that keep the shape of the line best
+    (Largest-Triangle-Three-Buckets), the first and last points are always kept."""
+    size = len(values)
+    if n >= size or n < 3:
+        return list(range(size))
+    y = np.asarray(values, dtype=np.float64)
+    # n - 2 buckets between the first and the last point
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    picked = [0]
+    for b in range(n - 2):
+        start, end = edges[b], edges[b + 1]
+        if b + 2 < len(edges):
+            # the triangle's third point is the average of the next bucket
+            next_x = (edges[b + 1] + edges[b + 2] - 1) / 2
+            next_y = y[edges[b + 1]:edges[b + 2]].mean()
+        else:
+            next_x, next_y = size - 1, y[-1]
+        a = picked[-1]
+        xs = np.arange(start, end)
+        area = np.abs((a - next_x) * (y[start:end] - y[a]) - (a - xs) * (next_y - y[a]))
+        picked.append(int(start) + int(np.argmax(area)))
+    picked.append(size - 1)
+    return picked
+
+
+class LineChart:
+    """The wolves/rabbits/grass history as lines, fed from the history list as it grows."""
+
+    def __init__(self, width, height, font, series, capacity=64):
+        """`series` is a (label, color) pair for each count column of the history."""
+        self.width = width
+        self.height = height
+        self.font = font
+        self.series = series
+        self.capacity = capacity
+        self.plot_width = width - 20
+        self.values = [[] for _ in series]
+        self.y_max = 1
+        self.labels = [font.render(label, True, color) for label, color in series]
+        self.background = self.draw_background()
+        self.surface = self.background.copy()
+
+    def draw_background(self):
+        surface = pygame.Surface((self.width, self.height))
+        # Background gradient for the chart
+        for i in range(self.height):
+            color = [int(start + (end - start) * (i / self.height)) for start, end in zip(GRADIENT_START, GRADIENT_END)]
+            pygame.draw.line(surface, color, (0, i), (self.width, i))
+        # Draw axes with softer colors
+        pygame.draw.line(surface, AXIS_COLOR, (10, self.height - 20), (self.width - 10, self.height - 20), 2)  # X-axis
+        pygame.draw.line(surface, AXIS_COLOR, (10, self.height - 20), (10, 20), 2)  # Y-axis
+        return surface
+
+    def x(self, i):
+        return int(10 + i * self.plot_width / self.capacity)
+
+    def y(self, value):
+        return self.height - 20 - int(value * (self.height - 40) / self.y_max)
+
+    def update(self, history):
+        """Take in the (month, *counts) entries added to `history` since the last call."""
+        new = history[len(self.values[0]):]
+        if not new:
+            return
+        start = len(self.values[0])
+        for entry in new:
+            for values, value in zip(self.values, entry[1:]):
+                values.append(value)
+        top = max(max(entry[1:]) for entry in new)
+        rescale = False
+        if len(self.values[0]) > self.capacity:
+            while len(self.values[0]) > self.capacity:
+                self.capacity *= 2
+            rescale = True
+        if top > self.y_max:
+            self.y_max = int(top * Y_HEADROOM) + 1
+            rescale = True
+        if rescale:
+            self.redraw()
+        else:
+            self.draw_points(max(start - 1, 0), len(self.values[0]))
+
+    def draw_points(self, start, end):
+        """Draw the ticks of points start..end - 1 and the segments between them."""
+        if self.plot_width / self.capacity >= MIN_TICK_SPACING:
+            for i in range(start, end):
+                pygame.draw.line(self.surface, AXIS_COLOR, (self.x(i), self.height - 20), (self.x(i), self.height - 25), 2)
+        for values, (_, color) in zip(self.values, self.series):
+            points = [(self.x(i), self.y(values[i])) for i in range(start, end)]
+            if len(points) > 1:
+                pygame.draw.lines(self.surface, color, False, points, LINE_WIDTH)
+
+    def redraw(self):
+        self.surface.blit(self.background, (0, 0))
+        size = len(self.values[0])
+        if size <= self.plot_width:
+            self.draw_points(0, size)
+            return
+        # more months than pixels: draw the downsampled lines
+        for values, (_, color) in zip(self.values, self.series):
+            points = [(self.x(i), self.y(values[i])) for i in lttb(values, self.plot_width)]
+            pygame.draw.lines(self.surface, color, False, points, LINE_WIDTH)
+
+    def draw(self, screen, position, month):
+        left, top = position
+        screen.blit(self.surface, position)
+        # Draw chart title with the current month
+        title_text = self.font.render(f"Month: {month}", True, TITLE_COLOR)
+        screen.blit(title_text, (left + self.width // 2 - title_text.get_width() // 2, top + 10))
+        # Display chart labels, bottom up in the order of the series
+        for i, label in enumerate(self.labels):
+            screen.blit(label, (left + self.width - 90, top + self.height - 40 - 20 * i))
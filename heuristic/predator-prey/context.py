@@ -3,3 +3,72 @@ class Context:
         self.grid = grid
         self.col_num = col_num
         self.row_num = row_num
+        # the entities on the grid by class, as dicts used as ordered sets: O(1) add and
+        # remove, and the iteration order doesn't depend on memory addresses
+        self.species = {}
+
+        # Neighbourhood tables, by flat cell index (row * col_num + col): the up to 8 cells
+        # around each cell, in the row-major order the entities used to scan them, so nothing
+        # checks bounds at run time
+        self.neighbour_positions = []
+        self.neighbour_indexes = []
+        for row in range(row_num):
+            for col in range(col_num):
+                around = [
+                    (i, j)
+                    for i in range(row - 1, row + 2)
+                    for j in range(col - 1, col + 2)
+                    if 0 <= i < row_num and 0 <= j < col_num and (i, j) != (row, col)
+                ]
+                self.neighbour_positions.append(tuple(around))
+                self.neighbour_indexes.append(tuple(i * col_num + j for i, j in around))
+        # how many cells of each class (None for barren) are around each cell, kept up to date by set()
+        self.around = {None: [len(around) for around in self.neighbour_indexes]}
+
+        for row in range(row_num):
+            for col in range(col_num):
+                if grid[row][col] is not None:
+                    entity, grid[row][col] = grid[row][col], None
+                    self.set((row, col), entity)
+
+    def get(self, position):
+        return self.grid[position[0]][position[1]]
+
+    def set(self, position, entity):
+        """Put `entity` (or None) in a cell, whatever was there leaves the grid."""
+        row, col = position
+        old = self.grid[row][col]
+        if old is not None:
+            self.species[type(old)].pop(old, None)
+        self.grid[row][col] = entity
+        if entity is not None:
+            self.species.setdefault(type(entity), {})[entity] = None
+
+        old_kind = None if old is None else type(old)
+        new_kind = None if entity is None else type(entity)
+        if old_kind is not new_kind:
+            before = self.around[old_kind]
+            after = self.around.get(new_kind)
+            if after is None:
+                after = self.around[new_kind] = [0] * (self.row_num * self.col_num)
+            for i in self.neighbour_indexes[row * self.col_num + col]:
+                before[i] -= 1
+                after[i] += 1
+
+    def members(self, species):
+        """The entities of a class on the grid, a snapshot that is safe to iterate while it changes."""
+        return list(self.species.get(species, ()))
+
+    def count(self, species):
+        return len(self.species.get(species, ()))
+
+    def neighbours(self, position, *species):
+        """The positions around `position` holding an entity of one of `species` (None for barren cells)."""
+        grid = self.grid
+        kinds = tuple(type(None) if kind is None else kind for kind in species)
+        return [(i, j) for i, j in self.neighbour_positions[position[0] * self.col_num + position[1]] if type(grid[i][j]) in kinds]
+
+    def count_around(self, position, species):
+        """How many of the cells around `position` hold a `species` (None for barren), in O(1)."""
+        around = self.around.get(species)
+        return around[position[0] * self.col_num + position[1]] if around else 0
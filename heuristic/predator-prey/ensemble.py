@@ -0,0 +1,200 @@
+import os
+import csv
+import sys
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from simulation import BACKENDS, HISTORY_COLUMNS, run
+from world import DEFAULT_PARAMS
+
+# Parameter sweeps: many independent seeded simulations on a process pool, e.g.
+#
+#   python ensemble.py --set wolf=0.01,0.02,0.05 --set rabbit_lifespan=12:36,24:48 --seeds 20 --out runs.parquet
+#
+# runs every combination of the settings with 20 seeds each. The trajectory of every run is
+# appended to the results file as it finishes (a Parquet row group per run, or CSV rows), and
+# the summary of each run (extinction times, oscillation period) goes to a CSV next to it.
+#
+# The settings are the densities of place_entities (wolf, rabbit, grass thresholds) and the
+# parameters of world.World (lifespans, reproductive ages, breeding chances).
+
+DENSITIES = ("wolf", "rabbit", "grass")
+# what each backend can be given besides the densities
+BACKEND_PARAMS = {"objects": (), "arrays": tuple(DEFAULT_PARAMS)}
+SUMMARY_COLUMNS = ["run", "seed", "settings", "months", "wolves_extinct", "rabbits_extinct", "period"]
+
+
+def extinction(counts):
+    """First month with a count of 0, None if the species survives."""
+    zeros = np.flatnonzero(counts == 0)
+    return int(zeros[0]) if len(zeros) else None
+
+
+def oscillation_period(counts, burn_in=20):
+    """Period in months of the population cycle, from the first peak of the autocorrelation,
+    None without a cycle (or too few months of it)."""
+    series = np.asarray(counts[burn_in:], dtype=np.float64)
+    if len(series) < 4 or not series.std():
+        return None
+    series -= series.mean()
+    size = len(series)
+    # autocorrelation through the FFT, zero-padded so it doesn't wrap around
+    spectrum = np.fft.rfft(series, 2 * size)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum))[:size]
+    acf /= acf[0]
+    # the first peak after the autocorrelation turns negative
+    negative = np.flatnonzero(acf < 0)
+    if not len(negative) or negative[0] > size // 2:
+        return None
+    lag = int(negative[0]) + int(np.argmax(acf[negative[0]:size // 2 + 1]))
+    return lag if acf[lag] > 0 else None
+
+
+def summarize(history):
+    """Extinction month of each species and the oscillation period of the rabbits while alive."""
+    history = np.asarray(history)
+    wolves_extinct = extinction(history[:, 1])
+    rabbits_extinct = extinction(history[:, 2])
+    alive = min(m for m in (wolves_extinct, rabbits_extinct, len(history)) if m is not None)
+    return {
+        "wolves_extinct": wolves_extinct,
+        "rabbits_extinct": rabbits_extinct,
+        "period": oscillation_period(history[:alive, 2]),
+    }
+
+
+def simulate(run_id, settings, seed, months, rows, cols, backend):
+    """One run in a worker process, returns (run id, history as an array, summary)."""
+    densities = {name: value for name, value in settings.items() if name in DENSITIES}
+    params = {name: value for name, value in settings.items() if name not in DENSITIES}
+    world = BACKENDS[backend](rows, cols, seed=seed, **params)
+    world.place_entities(**densities)
+    history = np.array(run(world, months), dtype=np.int32)
+    return run_id, history, summarize(history)
+
+
+class ResultsWriter:
+    """Appends the trajectory of each run to a Parquet file (pyarrow) or a CSV file."""
+
+    def __init__(self, path):
+        self.columns = ["run", "seed"] + HISTORY_COLUMNS
+        self.parquet = os.path.splitext(path)[1] == ".parquet"
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self.pa = pa
+            self.schema = pa.schema([(name, pa.int32()) for name in self.columns])
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.file = open(path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(self.columns)
+
+    def write(self, run_id, seed, history):
+        ids = np.full((len(history), 2), (run_id, seed), dtype=np.int32)
+        rows = np.hstack([ids, history])
+        if self.parquet:
+            self.writer.write_table(self.pa.Table.from_arrays([self.pa.array(column) for column in rows.T], schema=self.schema))
+        else:
+            self.writer.writerows(rows.tolist())
+
+    def close(self):
+        if self.parquet:
+            self.writer.close()
+        else:
+            self.file.close()
+
+
+def sweep(settings, seeds):
+    """Every combination of the settings ({name: [values]}) with every seed, as (settings, seed)."""
+    names = list(settings)
+    for values in itertools.product(*(settings[name] for name in names)):
+        for seed in seeds:
+            yield dict(zip(names, values)), seed
+
+
+def ensemble(settings, seeds, out, summary_path, months=1000, rows=30, cols=60, backend="arrays", workers=None):
+    """Run the sweep on a process pool, writing the runs as they finish. Returns the summaries."""
+    # checked here, a worker would only fail once the pool is running
+    unknown = [name for name in settings if name not in DENSITIES + BACKEND_PARAMS[backend]]
+    if unknown:
+        raise ValueError("The {} backend doesn't take {}".format(backend, ", ".join(unknown)))
+    runs = list(sweep(settings, seeds))
+    results = ResultsWriter(out)
+    summaries = []
+    with open(summary_path, "w", newline="") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, SUMMARY_COLUMNS)
+        writer.writeheader()
+        futures = [pool.submit(simulate, run_id, setting, seed, months, rows, cols, backend)
+                   for run_id, (setting, seed) in enumerate(runs)]
+        try:
+            for future in as_completed(futures):
+                run_id, history, summary = future.result()
+                setting, seed = runs[run_id]
+                results.write(run_id, seed, history)
+                summary = dict(summary, run=run_id, seed=seed, settings=format_settings(setting), months=months)
+                writer.writerow(summary)
+                summaries.append(summary)
+        finally:
+            results.close()
+    return summaries
+
+
+def format_settings(setting):
+    return " ".join("{}={}".format(name, ":".join(map(str, value)) if isinstance(value, tuple) else value)
+                    for name, value in setting.items())
+
+
+def parse_value(text):
+    """0.02 -> 0.02, 24 -> 24, 12:36 -> (12, 36)"""
+    def number(part):
+        return float(part) if "." in part or "e" in part else int(part)
+    return tuple(number(part) for part in text.split(":")) if ":" in text else number(text)
+
+
+def parse_setting(text):
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError("expected name=value,value,... got {!r}".format(text))
+    return name, [parse_value(value) for value in values.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run seeded predator-prey simulations for every combination of settings on a process pool")
+    parser.add_argument("--set", dest="settings", type=parse_setting, action="append", default=[], metavar="NAME=V1,V2",
+                        help="values to sweep: wolf/rabbit/grass densities or a world.py parameter (a:b for ranges)")
+    parser.add_argument("--seeds", type=int, default=10, help="runs per combination")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--months", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--cols", type=int, default=60)
+    parser.add_argument("--backend", choices=BACKENDS, default="arrays", help="the objects backend only takes the densities")
+    parser.add_argument("--workers", type=int, help="processes, defaults to the number of cores")
+    parser.add_argument("--out", default="runs.csv", help="trajectories of every run, .csv or .parquet")
+    parser.add_argument("--summary", help="summary of every run, defaults to the results file name with .summary.csv")
+    args = parser.parse_args()
+
+    summary_path = args.summary or os.path.splitext(args.out)[0] + ".summary.csv"
+    start = time.perf_counter()
+    try:
+        summaries = ensemble(dict(args.settings), range(args.seed, args.seed + args.seeds), args.out, summary_path,
+                             args.months, args.rows, args.cols, args.backend, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    print("{} runs of {} months in {:.1f}s".format(len(summaries), args.months, elapsed), file=sys.stderr)
+    print("{:<40} {:>5} {:>14} {:>15} {:>7}".format("settings", "runs", "wolves extinct", "rabbits extinct", "period"))
+    by_setting = {}
+    for summary in summaries:
+        by_setting.setdefault(summary["settings"], []).append(summary)
+    for setting, group in sorted(by_setting.items()):
+        periods = [s["period"] for s in group if s["period"] is not None]
+        print("{:<40} {:>5} {:>14} {:>15} {:>7}".format(
+            setting or "defaults", len(group),
+            "{}/{}".format(sum(s["wolves_extinct"] is not None for s in group), len(group)),
+            "{}/{}".format(sum(s["rabbits_extinct"] is not None for s in group), len(group)),
+            "{:.0f}".format(np.median(periods)) if periods else "-"))
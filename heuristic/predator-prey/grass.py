@@ -17,26 +17,15 @@ class Grass:
 
     def reproduce(self):
         """Handles the grass reproduction process."""
-        row, col = self.position
-        grass_cells = []
-        barren_cells = []
-
-        # Look for neighboring cells (8 possible directions)
-        for i in range(row - 1, row + 2):
-            for j in range(col - 1, col + 2):
-                if 0 <= i < self.ctx.row_num and 0 <= j < self.ctx.col_num:
-                    cell = self.ctx.grid[i][j]
-                    if isinstance(cell, Grass):  # Grass cell
-                        grass_cells.append((i, j))
-                    elif cell is None:  # Barren cell
-                        barren_cells.append((i, j))
-
-        # If there are more than 2 grass cells and at least one barren cell around
-        if len(grass_cells) > 2 and barren_cells:
+        # If there are more than 2 grass cells (this one included) and at least one barren cell around
+        if (
+            self.ctx.count_around(self.position, Grass) + 1 > 2
+            and self.ctx.count_around(self.position, None)
+        ):
             # Randomly choose a barren cell to become grass
-            target_cell = random.choice(barren_cells)
+            target_cell = random.choice(self.ctx.neighbours(self.position, None))
             new = Grass(target_cell, ctx=self.ctx)  # Turn barren cell into grass
-            self.ctx.grid[target_cell[0]][target_cell[1]] = new
+            self.ctx.set(target_cell, new)
             return new
 
         return None  # No reproduction
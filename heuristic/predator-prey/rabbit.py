@@ -22,9 +22,7 @@ class Rabbit:
             if self.age > self.lifespan or self.food_intake < -1:
                 self.is_alive = False
                 # Replace rabbit's dead cell with grass
-                self.ctx.grid[self.position[0]][self.position[1]] = Grass(
-                    self.position, self.ctx
-                )
+                self.ctx.set(self.position, Grass(self.position, self.ctx))
 
     def move(self):
         if not self.is_alive:
@@ -41,24 +39,16 @@ class Rabbit:
             return
 
         row, col = self.position
-        grass_moves = []
-        barren_moves = []
         # Look for neighboring cells with grass or barren land
-        for i in range(row - 1, row + 2):
-            for j in range(col - 1, col + 2):
-                if 0 <= i < self.ctx.row_num and 0 <= j < self.ctx.col_num:
-                    cell = self.ctx.grid[i][j]
-                    if isinstance(cell, Grass):  # Grass cell
-                        grass_moves.append((i, j))
-                    elif cell is None:  # Barren cell
-                        barren_moves.append((i, j))
+        grass_moves = self.ctx.neighbours(self.position, Grass)
+        barren_moves = [] if grass_moves else self.ctx.neighbours(self.position, None)
 
         # Prefer to move to a grass cell if possible
         if grass_moves:
             target_row, target_col = random.choice(grass_moves)
             # Eat the grass, replace it with barren land
-            self.ctx.grid[row][col] = None
-            self.ctx.grid[target_row][target_col] = self
+            self.ctx.set((row, col), None)
+            self.ctx.set((target_row, target_col), self)
 
             self.food_intake += 0.3
             self.position = (target_row, target_col)
@@ -66,8 +56,8 @@ class Rabbit:
         elif barren_moves:
             target_row, target_col = random.choice(barren_moves)
             # Move to the selected barren cell
-            self.ctx.grid[row][col] = None
-            self.ctx.grid[target_row][target_col] = self
+            self.ctx.set((row, col), None)
+            self.ctx.set((target_row, target_col), self)
 
             self.position = (target_row, target_col)
 
@@ -92,23 +82,13 @@ class Rabbit:
             if random.random() > breeding_chance:
                 return None
 
-            # Find surrounding grass cells
-            grass_cells = [
-                (i, j)
-                for i in range(self.position[0] - 1, self.position[0] + 2)
-                for j in range(self.position[1] - 1, self.position[1] + 2)
-                if 0 <= i < self.ctx.row_num
-                and 0 <= j < self.ctx.col_num
-                and isinstance(self.ctx.grid[i][j], Grass)
-            ]
-
             # If there are more than 2 grass cells nearby, breed
-            if len(grass_cells) > 2:
+            if self.ctx.count_around(self.position, Grass) > 2:
                 # Pick one random grass cell and replace it with a new rabbit
-                new_pos = random.choice(grass_cells)
+                new_pos = random.choice(self.ctx.neighbours(self.position, Grass))
                 # Create a new rabbit in the chosen cell
                 new_rabbit = Rabbit(new_pos, ctx=self.ctx)
-                self.ctx.grid[new_pos[0]][new_pos[1]] = new_rabbit
+                self.ctx.set(new_pos, new_rabbit)
                 return new_rabbit
 
         return None  # No breeding occurred
@@ -0,0 +1,134 @@
+import os
+import csv
+import sys
+import time
+import random
+import argparse
+from context import Context
+from wolf import Wolf
+from rabbit import Rabbit
+from grass import Grass
+from world import World, EMPTY, GRASS, RABBIT, WOLF
+
+# The simulation without the window: main.py draws it, this runs it as fast as it goes, e.g.
+#
+#   python simulation.py --months 5000 --seed 1 --out history.csv
+#
+# Two backends with the same API (place_entities, step, counts, kind, month): the grid of
+# Wolf/Rabbit/Grass objects of main.py, and the numpy arrays of world.py for large grids.
+
+
+class Simulation:
+    """The grid of Wolf, Rabbit and Grass objects, one month per step()."""
+
+    def __init__(self, rows=30, cols=60, seed=None):
+        # the entities draw from the random module
+        if seed is not None:
+            random.seed(seed)
+        self.rows = rows
+        self.cols = cols
+        self.grid = [[None for _ in range(cols)] for _ in range(rows)]
+        self.ctx = Context(grid=self.grid, col_num=cols, row_num=rows)
+        self.month = 0
+
+    def place_entities(self, wolf=0.02, rabbit=0.3, grass=0.6):
+        for row in range(self.rows):
+            for col in range(self.cols):
+                val = random.random()
+                if val < wolf:
+                    self.ctx.set((row, col), Wolf(position=(row, col), ctx=self.ctx))
+                elif val < rabbit:
+                    self.ctx.set((row, col), Rabbit(position=(row, col), ctx=self.ctx))
+                elif val < grass:
+                    self.ctx.set((row, col), Grass(position=(row, col), ctx=self.ctx))
+
+    def counts(self):
+        """(wolves, rabbits, grass) on the grid."""
+        return self.ctx.count(Wolf), self.ctx.count(Rabbit), self.ctx.count(Grass)
+
+    @property
+    def kind(self):
+        """The grid as kinds (world.EMPTY, GRASS, RABBIT, WOLF), like World.kind."""
+        return [[WOLF if isinstance(cell, Wolf) else RABBIT if isinstance(cell, Rabbit)
+                 else GRASS if isinstance(cell, Grass) else EMPTY for cell in row] for row in self.grid]
+
+    def step(self):
+        """One month: grass spreads, then the rabbits and then the wolves grow, move and breed."""
+        self.month += 1
+
+        # each phase takes the entities on the grid when it starts: what is born during it
+        # waits for the next month, what dies or is eaten during it is skipped
+        for g in self.ctx.members(Grass):
+            if self.ctx.get(g.position) is g:
+                g.reproduce()
+
+        for r in self.ctx.members(Rabbit):
+            if self.ctx.get(r.position) is r:
+                r.grow()
+                r.move()
+                r.breed()
+
+        for w in self.ctx.members(Wolf):
+            if self.ctx.get(w.position) is w:
+                w.grow()
+                w.move()
+                w.breed()
+
+
+BACKENDS = {"objects": Simulation, "arrays": World}
+
+
+def run(world, months=None, observer=None, every=1):
+    """Step `world` for `months` (forever with None), returns the history of
+    (month, wolves, rabbits, grass).
+
+    `observer(world, history)` is called at the start and then every `every` months, it stops
+    the run by returning False (e.g. when its window is closed).
+    """
+    history = [(world.month, *world.counts())]
+    if observer and observer(world, history) is False:
+        return history
+    while months is None or world.month < months:
+        world.step()
+        history.append((world.month, *world.counts()))
+        if observer and world.month % every == 0 and observer(world, history) is False:
+            break
+    return history
+
+
+HISTORY_COLUMNS = ["month", "wolves", "rabbits", "grass"]
+
+
+def write_history(history, path):
+    """CSV, or Parquet for a .parquet path (needs pyarrow)."""
+    if os.path.splitext(path)[1] == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(zip(*history)) or [[] for _ in HISTORY_COLUMNS]
+        pq.write_table(pa.table({name: pa.array(column, type=pa.int32()) for name, column in zip(HISTORY_COLUMNS, columns)}), path)
+    else:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(HISTORY_COLUMNS)
+            writer.writerows(history)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the wolf, rabbit and grass simulation without a window")
+    parser.add_argument("--months", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--cols", type=int, default=60)
+    parser.add_argument("--backend", choices=BACKENDS, default="objects", help="grid of objects, or numpy arrays for large grids")
+    parser.add_argument("--out", default="history.csv", help="history file, .csv or .parquet")
+    args = parser.parse_args()
+
+    world = BACKENDS[args.backend](args.rows, args.cols, seed=args.seed)
+    world.place_entities()
+    start = time.perf_counter()
+    history = run(world, args.months)
+    elapsed = time.perf_counter() - start
+    write_history(history, args.out)
+    print("{} months in {:.2f}s ({:.1f} months/s), final wolves/rabbits/grass: {}/{}/{}".format(
+        args.months, elapsed, args.months / elapsed, *history[-1][1:]), file=sys.stderr)
@@ -0,0 +1,220 @@
+import numpy as np
+
+# Array backend of the simulation: the same rules as Wolf, Rabbit and Grass, but the world is a
+# few numpy arrays (struct of arrays) instead of a grid of objects, so it scales to grids far
+# larger than the 30x60 of main.py.
+#
+# Every array is padded with a one cell border (kind BORDER) and indexed by flat cell index, so
+# the 8 neighbours of cell i are i + offset for the offsets below, without bounds checks. Grass
+# spreading and what applies to every animal at once (aging, deaths, the chance to move) are done
+# on whole arrays; moves and births depend on the cells the previous animals changed, so they stay a loop, over
+# memoryviews of the same arrays (plain ints and floats, much cheaper than numpy scalars).
+
+EMPTY, GRASS, RABBIT, WOLF = 0, 1, 2, 3
+BORDER = -1
+
+WOLF_AGE = (0, 24)  # age of the wolves placed at the start and of the newborn ones, as in Wolf
+
+# The rules that can be changed per world (World(rows, cols, **params)), set as in Rabbit and Wolf
+DEFAULT_PARAMS = {
+    "rabbit_lifespan": (12, 36),  # 1 to 3 years
+    "rabbit_reproductive_age": 5,  # Rabbits breed at 5 months
+    "rabbit_breeding": (0.6, 0.4, 0.2),  # breeding chance when young, middle-aged and old
+    "wolf_lifespan": (72, 96),  # 6 to 8 years
+    "wolf_reproductive_age": 24,  # Wolves breed at 2 years (24 months)
+    "wolf_breeding": (0.6, 0.4, 0.2),
+}
+
+
+class World:
+    def __init__(self, rows, cols, seed=None, **params):
+        unknown = params.keys() - DEFAULT_PARAMS.keys()
+        if unknown:
+            raise TypeError("Unknown parameters: {}".format(", ".join(sorted(unknown))))
+        self.params = dict(DEFAULT_PARAMS, **params)
+        self.rows = rows
+        self.cols = cols
+        self.rng = np.random.default_rng(seed)
+        self.month = 0
+
+        width = cols + 2
+        self.shape = (rows + 2, width)
+        self.offsets = [-width - 1, -width, -width + 1, -1, 1, width - 1, width, width + 1]
+        self.offset_array = np.array(self.offsets)
+
+        cells = np.full(self.shape, BORDER, dtype=np.int8)
+        cells[1:-1, 1:-1] = EMPTY
+        self.cells = cells.ravel()
+        self.age = np.zeros(self.cells.size, dtype=np.int16)
+        self.lifespan = np.zeros(self.cells.size, dtype=np.int16)
+        self.food_intake = np.zeros(self.cells.size, dtype=np.float64)
+
+        self.kind_at = memoryview(self.cells)
+        self.age_at = memoryview(self.age)
+        self.lifespan_at = memoryview(self.lifespan)
+        self.food_at = memoryview(self.food_intake)
+
+    @property
+    def kind(self):
+        """The (rows, cols) grid of cell kinds, a view without the border."""
+        return self.cells.reshape(self.shape)[1:-1, 1:-1]
+
+    def counts(self):
+        """(wolves, rabbits, grass) on the grid."""
+        counts = np.bincount(self.kind.ravel(), minlength=4)
+        return int(counts[WOLF]), int(counts[RABBIT]), int(counts[GRASS])
+
+    def place_entities(self, wolf=0.02, rabbit=0.3, grass=0.6):
+        """Fill the grid at random, with the same thresholds as main.py's place_entities."""
+        val = self.rng.random((self.rows, self.cols))
+        self.kind[...] = np.select([val < wolf, val < rabbit, val < grass], [WOLF, RABBIT, GRASS], EMPTY)
+        for kind, ages, lifespans in ((RABBIT, (0, 0), self.params["rabbit_lifespan"]), (WOLF, WOLF_AGE, self.params["wolf_lifespan"])):
+            cells = np.flatnonzero(self.cells == kind)
+            self.age[cells] = self.rng.integers(*ages, size=len(cells), endpoint=True)
+            self.lifespan[cells] = self.rng.integers(*lifespans, size=len(cells), endpoint=True)
+            self.food_intake[cells] = 0
+
+    def neighbours(self, cell, *kinds):
+        kind_at = self.kind_at
+        return [cell + offset for offset in self.offsets if kind_at[cell + offset] in kinds]
+
+    def put(self, cell, kind, age=0, lifespan=0, food_intake=0.0):
+        self.kind_at[cell] = kind
+        self.age_at[cell] = age
+        self.lifespan_at[cell] = lifespan
+        self.food_at[cell] = food_intake
+
+    def relocate(self, source, target, left_behind):
+        """Move the animal at `source` to `target` (whatever was there is gone)."""
+        self.put(target, self.kind_at[source], self.age_at[source], self.lifespan_at[source], self.food_at[source])
+        self.put(source, left_behind)
+
+    def grow(self, kind, hunger):
+        """Age every animal of `kind` in one pass, the dead ones leave grass behind. Returns the
+        cells of the survivors."""
+        alive = self.cells == kind
+        self.age[alive] += 1
+        self.food_intake[alive] -= hunger
+        dead = alive & ((self.age > self.lifespan) | (self.food_intake < -1))
+        self.cells[dead] = GRASS
+        self.age[dead] = 0
+        self.lifespan[dead] = 0
+        self.food_intake[dead] = 0
+        return np.flatnonzero(alive & ~dead)
+
+    def chances(self, cells, steps, values):
+        """Per animal, values[i] for the first age/lifespan threshold steps[i] it is under."""
+        ratio = self.age[cells] / self.lifespan[cells]
+        return np.select([ratio < step for step in steps], values[:-1], values[-1])
+
+    def around(self, kind):
+        """How many cells of `kind` are in the 3x3 window of every cell (itself included), padded like the cells."""
+        grid = (self.cells == kind).reshape(self.shape)
+        rows, cols = self.rows, self.cols
+        counts = np.zeros(self.shape, dtype=np.int8)
+        window = counts[1:-1, 1:-1]
+        for i in range(3):
+            for j in range(3):
+                window += grid[i:i + rows, j:j + cols]
+        return counts.ravel()
+
+    def spread_grass(self):
+        """Every grass with more than 2 grass cells around (itself included) seeds one barren
+        neighbour, one after the other in a random order, as Grass.reproduce does.
+
+        A grass only sees the cells within 2 of it change before its turn, so every grass
+        whose turn comes before that of all the grass still waiting within 2 cells can go at
+        once: the month is a few vectorized rounds of those, with the same result as the
+        one-by-one order. Grass without a barren neighbour is left out, it never gets one.
+        """
+        width = self.shape[1]
+        cells = np.flatnonzero((self.cells == GRASS) & (self.around(EMPTY) > 0))
+        # turns on a copy of the grid with a border of 2, so the 5x5 windows stay inside
+        turn = np.full((self.shape[0] + 2) * (width + 2), len(cells))
+        slots = cells + width + 3 + 2 * (cells // width)
+        turn[slots] = self.rng.permutation(len(cells))
+        window = np.array([i * (width + 2) + j for i in range(-2, 3) for j in range(-2, 3)])
+        around = np.append(self.offset_array, 0)
+        while len(cells):
+            kinds = self.cells[cells[:, None] + around]  # the 3x3 windows, the cell itself last
+            barren = kinds[:, :8] == EMPTY
+            choices = barren.sum(axis=1)
+            going = turn[slots] == turn[slots[:, None] + window].min(axis=1)
+            spreading = going & (choices > 0) & ((kinds == GRASS).sum(axis=1) > 2)
+            picks = (self.rng.random(int(spreading.sum())) * choices[spreading]).astype(np.int64)
+            # the picks-th barren neighbour of each spreading grass
+            choice = np.argmax(np.cumsum(barren[spreading], axis=1) > picks[:, None], axis=1)
+            self.cells[cells[spreading] + self.offset_array[choice]] = GRASS
+            done = going | (choices == 0)
+            turn[slots[done]] = len(turn)
+            cells, slots = cells[~done], slots[~done]
+
+    def step_rabbits(self):
+        rabbits = self.grow(RABBIT, 0.1)
+        n = len(rabbits)
+        # Young rabbits move with a 0.4 chance, middle-aged ones 0.7, older ones 0.2
+        moving = (self.rng.random(n) <= self.chances(rabbits, (0.5, 0.85), (0.4, 0.7, 0.2))).tolist()
+        breeding = self.chances(rabbits, (0.75, 0.9), self.params["rabbit_breeding"]).tolist()
+        draws = self.rng.random((3, n)).tolist()  # where to move, breed?, where to breed
+        lifespans = self.rng.integers(*self.params["rabbit_lifespan"], size=n, endpoint=True).tolist()
+        reproductive_age = self.params["rabbit_reproductive_age"]
+        # the cells are safe to walk in order: animals only move onto (and are born on) grass
+        # or barren cells, never onto one still waiting for its turn
+        for k, cell in enumerate(rabbits.tolist()):
+            if moving[k]:
+                grass_moves = self.neighbours(cell, GRASS)
+                moves = grass_moves or self.neighbours(cell, EMPTY)
+                if moves:
+                    target = moves[int(draws[0][k] * len(moves))]
+                    self.relocate(cell, target, EMPTY)
+                    if grass_moves:
+                        self.food_at[target] += 0.3  # Eat the grass
+                    cell = target
+
+            if self.age_at[cell] < reproductive_age:
+                continue
+            # Increase breeding chance if the rabbit has eaten grass
+            chance = breeding[k] + (0.2 if self.food_at[cell] > 0 else -0.2)
+            if draws[1][k] > chance:
+                continue
+            grass_cells = self.neighbours(cell, GRASS)
+            if len(grass_cells) > 2:
+                self.put(grass_cells[int(draws[2][k] * len(grass_cells))], RABBIT, 0, lifespans[k])
+
+    def step_wolves(self):
+        wolves = self.grow(WOLF, 0.2)
+        n = len(wolves)
+        # Young wolves move with a 0.7 chance, middle-aged ones 0.5, older ones 0.3
+        moving = (self.rng.random(n) < self.chances(wolves, (0.75, 0.9), (0.7, 0.5, 0.3))).tolist()
+        breeding = self.chances(wolves, (0.75, 0.9), self.params["wolf_breeding"]).tolist()
+        draws = self.rng.random((3, n)).tolist()
+        ages = self.rng.integers(*WOLF_AGE, size=n, endpoint=True).tolist()
+        lifespans = self.rng.integers(*self.params["wolf_lifespan"], size=n, endpoint=True).tolist()
+        reproductive_age = self.params["wolf_reproductive_age"]
+        for k, cell in enumerate(wolves.tolist()):
+            if moving[k]:
+                rabbit_moves = self.neighbours(cell, RABBIT)
+                moves = rabbit_moves or self.neighbours(cell, GRASS) or self.neighbours(cell, EMPTY)
+                if moves:
+                    target = moves[int(draws[0][k] * len(moves))]
+                    self.relocate(cell, target, GRASS)  # the wolf leaves grass behind
+                    if rabbit_moves:
+                        self.food_at[target] += 1  # Eat the rabbit
+                    cell = target
+
+            if self.age_at[cell] < reproductive_age:
+                continue
+            # Wolves that have eaten more will have an increased chance to breed
+            chance = breeding[k] + (0.1 if self.food_at[cell] > 0 else -0.5)
+            if draws[1][k] > chance:
+                continue
+            cells = self.neighbours(cell, GRASS, RABBIT)
+            if len(cells) >= 3:
+                self.put(cells[int(draws[2][k] * len(cells))], WOLF, ages[k], lifespans[k])
+
+    def step(self):
+        """One month: grass spreads, then the rabbits and then the wolves grow, move and breed."""
+        self.month += 1
+        self.spread_grass()
+        self.step_rabbits()
+        self.step_wolves()